@@ -0,0 +1,267 @@
+import time
+from array import array
+from collections import OrderedDict
+
+from board import compile_board
+from node_store import NodeStore
+from reachability_a_star import ReachabilityAStarSolver
+from solver_base import NO_MOVE, BaseSolver
+from state import StateCodec
+
+
+class AllTargetsSearch:
+    def __init__(self, compiled_board, initial_positions, max_depth=30, max_states=2000000):
+        """
+        One breadth-first search from a robot placement that answers every
+        possible target at once.
+
+        The BFS runs over full states, where every robot keeps its color, and
+        records the first node at which each (robot, cell) pair is reached.
+        Since layers are visited in order of depth, that node is an optimal
+        solution for the target "robot on cell", and its path is only rebuilt
+        when asked for.
+
+        Args:
+            compiled_board (CompiledBoard): The board the robots are on.
+            initial_positions (dict): Mapping from robot color to position tuple (row, col).
+            max_depth (int): Maximum number of moves (depth) to search.
+            max_states (int): Number of states after which the search stops, so memory stays bounded.
+        """
+        self.compiled_board = compiled_board
+        self.initial_positions = initial_positions
+        self.max_depth = max_depth
+        self.max_states = max_states
+        self.colors = list(initial_positions.keys())
+        # Slot order is the order of initial_positions, and states are never made canonical
+        self.codec = StateCodec(compiled_board, initial_positions, self.colors[0])
+        self.nodes = None
+        # first_nodes[robot * num_cells + cell]: first node with the robot on the cell, -1 if none
+        self.first_nodes = None
+        # Deepest layer searched completely: pairs not found are more moves away than that
+        self.complete_depth = 0
+        self.stats = {}
+
+    def run(self, progress_callback=None):
+        """
+        Run the search until every pair is reached, max_depth is complete or
+        max_states states are stored.
+
+        Args:
+            progress_callback (callable): Optional callback function to report progress
+                                        and check for cancellation
+
+        Returns:
+            bool: False if the search was cancelled.
+        """
+        codec = self.codec
+        compiled_board = self.compiled_board
+        slide = compiled_board.slide
+        num_cells = compiled_board.num_cells
+        shifts = codec.shifts
+        nodes = NodeStore(codec.state_bits)
+        first_nodes = array("l", [-1]) * (codec.num_robots * num_cells)
+        self.nodes = nodes
+        self.first_nodes = first_nodes
+
+        start_state = codec.pack(self.initial_positions)
+        root = nodes.add(start_state, -1, NO_MOVE, 0)
+        visited = {start_state}
+        for robot, cell in enumerate(codec.cells(start_state)):
+            first_nodes[robot * num_cells + cell] = root
+        unreached = len(first_nodes) - codec.num_robots
+        frontier = [root]
+        expansions = 0
+        generated = 0
+        last_report_time = time.time()
+        depth = 0
+        self.complete_depth = 0
+
+        while frontier and unreached and depth < self.max_depth and len(nodes) < self.max_states:
+            depth += 1
+            next_frontier = []
+            for node in frontier:
+                if len(nodes) >= self.max_states:
+                    break
+                state = nodes.states[node]
+                cells = codec.cells(state)
+                expansions += 1
+                for robot, cell in enumerate(cells):
+                    for direction in range(4):
+                        stop = slide(cell, direction, cells)
+                        if stop == cell:
+                            continue
+                        generated += 1
+                        new_state = state + ((stop - cell) << shifts[robot])
+                        if new_state in visited:
+                            continue
+                        visited.add(new_state)
+                        child = nodes.add(new_state, node, (cell << 2) | direction, depth)
+                        next_frontier.append(child)
+                        key = robot * num_cells + stop
+                        if first_nodes[key] < 0:
+                            first_nodes[key] = child
+                            unreached -= 1
+
+                # Report progress every 0.5 seconds
+                if progress_callback and expansions % 100 == 0:
+                    current_time = time.time()
+                    if current_time - last_report_time > 0.5:
+                        last_report_time = current_time
+                        if not progress_callback(len(nodes)):
+                            self._record_stats(expansions, generated)
+                            return False
+            else:
+                self.complete_depth = depth
+            frontier = next_frontier
+
+        # Nothing left to expand means every reachable pair was found
+        if not frontier or not unreached:
+            self.complete_depth = self.max_depth
+        self._record_stats(expansions, generated)
+        if progress_callback:
+            progress_callback(len(nodes))
+        return True
+
+    def distance(self, color, pos):
+        """
+        Return the optimal number of moves to bring a robot to a cell, or None
+        if it can't be done within the moves searched (see complete_depth).
+        """
+        node = self._first_node(color, pos)
+        return None if node < 0 else self.nodes.g_costs[node]
+
+    def move_codes(self, color, pos):
+        """Return the move codes of an optimal solution for a robot and a cell, or None."""
+        node = self._first_node(color, pos)
+        return None if node < 0 else self.nodes.path(node)
+
+    def distances(self, color):
+        """
+        Return the optimal number of moves to bring a robot to every cell.
+
+        Returns:
+            dict: Mapping from position tuple (row, col) to number of moves, for the cells reached.
+        """
+        return {
+            self.compiled_board.position(cell): self.nodes.g_costs[node]
+            for cell, node in self._robot_nodes(color)
+            if node >= 0
+        }
+
+    def _first_node(self, color, pos):
+        robot = self.colors.index(color)
+        return self.first_nodes[robot * self.compiled_board.num_cells + self.compiled_board.index(pos)]
+
+    def _robot_nodes(self, color):
+        num_cells = self.compiled_board.num_cells
+        start = self.colors.index(color) * num_cells
+        return enumerate(self.first_nodes[start:start + num_cells])
+
+    def _record_stats(self, expansions, generated):
+        self.stats = {
+            "expansions": expansions,
+            "generated": generated,
+            "states_explored": len(self.nodes),
+            "complete_depth": self.complete_depth,
+            "branching_factor": generated / expansions if expansions else 0.0,
+        }
+
+
+# Finished searches by board layout, robot placement and limits, least recently used first
+_searches = OrderedDict()
+MAX_SEARCHES = 4
+
+
+class AllTargetsSolver(BaseSolver):
+    # Breadth-first, with an admissible A* when the search is cut short
+    admissible = True
+
+    def __init__(self, board, initial_positions, target_color, target_pos, max_depth=30, max_states=2000000):
+        """
+        Solver answering a target from an AllTargetsSearch of its robot placement.
+
+        The search is shared by all the targets of a placement: it is kept in
+        a small LRU cache, so solving further targets on the same board with
+        the same robots is only a path lookup.
+
+        Args:
+            board (list): 2D list representing the game board cells. Each cell is a dict with "walls".
+            initial_positions (dict): Mapping from robot color to position tuple (row, col).
+            target_color (str): The color of the robot that must reach the target.
+            target_pos (tuple): The target cell position (row, col).
+            max_depth (int): Maximum number of moves (depth) to search.
+            max_states (int): Number of states after which the search stops.
+        """
+        super().__init__(board, initial_positions, target_color, target_pos, max_depth)
+        self.max_states = max_states
+        self.search = None
+
+    def solve(self, progress_callback=None):
+        """
+        Find an optimal solution for the target.
+
+        When max_states stopped the search before it was complete up to
+        max_depth and the target wasn't reached, the puzzle is solved by the
+        robot-aware A* instead, so None always means there is no solution
+        within max_depth (or the search was cancelled). self.stats["fallback"]
+        tells which happened.
+
+        Returns:
+            list: A list of (color, direction) moves, or None if no solution is found.
+        """
+        search = self.all_targets(progress_callback)
+        if search is None:
+            return None
+        move_codes = search.move_codes(self.target_color, self.target_pos)
+        if move_codes is not None:
+            return self._to_moves(move_codes)
+        if search.complete_depth >= self.max_depth:
+            return None
+        solver = ReachabilityAStarSolver(self.board, self.initial_positions, self.target_color, self.target_pos,
+                                         self.max_depth, heuristic="robot_aware")
+        solution = solver.solve(progress_callback)
+        self.stats = dict(solver.stats, fallback=True, complete_depth=search.complete_depth)
+        return solution
+
+    def solution(self, color, pos):
+        """Return an optimal list of (color, direction) moves bringing a robot to a cell, or None."""
+        search = self.all_targets()
+        move_codes = search.move_codes(color, pos)
+        return self._to_moves(move_codes) if move_codes is not None else None
+
+    def all_targets(self, progress_callback=None):
+        """
+        Return the AllTargetsSearch of the robot placement, running it unless it is cached.
+
+        Returns:
+            AllTargetsSearch: The finished search, or None if it was cancelled.
+        """
+        key = (self.compiled_board.layout_key, tuple(self.initial_positions.items()),
+               self.max_depth, self.max_states)
+        search = _searches.get(key)
+        if search is None:
+            search = AllTargetsSearch(self.compiled_board, self.initial_positions, self.max_depth, self.max_states)
+            if not search.run(progress_callback):
+                self.stats = search.stats
+                return None
+            _searches[key] = search
+            if len(_searches) > MAX_SEARCHES:
+                _searches.popitem(last=False)
+        else:
+            _searches.move_to_end(key)
+            if progress_callback:
+                progress_callback(search.stats["states_explored"])
+        self.search = search
+        self.stats = dict(search.stats, fallback=False)
+        return search
+
+
+def solve_all_targets(board, initial_positions, max_depth=30, max_states=2000000, progress_callback=None):
+    """
+    Run an AllTargetsSearch for a board and robot placement.
+
+    Returns:
+        AllTargetsSearch: The finished search, or None if it was cancelled.
+    """
+    search = AllTargetsSearch(compile_board(board), initial_positions, max_depth, max_states)
+    return search if search.run(progress_callback) else None
@@ -0,0 +1,139 @@
+from distance_tables import UNREACHABLE
+from reachability_a_star import ReachabilityAStarSolver
+from solver_base import WEIGHT_SCALE
+
+# Heuristic weights of the successive searches, the last one is plain A*
+DEFAULT_WEIGHTS = (2, 1.5, 1)
+
+
+class AnytimeSolver(ReachabilityAStarSolver):
+    def __init__(self, board, initial_positions, target_color, target_pos, max_depth=30,
+                 heuristic="reachability", weights=DEFAULT_WEIGHTS):
+        """
+        Solver that finds a rough solution quickly and improves it until it is proven optimal.
+
+        Args:
+            board (list): 2D list representing the game board cells. Each cell is a dict with "walls".
+            initial_positions (dict): Mapping from robot color to position tuple (row, col).
+            target_color (str): The color of the robot that must reach the target.
+            target_pos (tuple): The target cell position (row, col).
+            max_depth (int): Maximum number of moves (depth) to search.
+            heuristic (str): 'reachability' or 'robot_aware' (see ReachabilityAStarSolver).
+            weights (tuple): Decreasing heuristic weights of the searches, ending with 1.
+        """
+        super().__init__(board, initial_positions, target_color, target_pos, max_depth, heuristic)
+        if not weights or weights[-1] != 1 or any(a < b for a, b in zip(weights, weights[1:])):
+            raise ValueError(f"Weights must decrease down to 1: {weights!r}")
+        self.weights = weights
+
+    def solve(self, progress_callback=None):
+        """
+        Find an optimal solution, see anytime_search.
+
+        Returns:
+            list: A list of (color, direction) moves, or None if no solution is found.
+        """
+        best = None
+        for best in self.anytime_search(progress_callback):
+            pass
+        # A cancelled search may leave a solution that isn't proven optimal
+        return best["moves"] if best is not None and best["optimal"] else None
+
+    def anytime_search(self, progress_callback=None):
+        """
+        Generate better and better solutions, ending with a proven optimal one.
+
+        Runs weighted A* searches (see BaseAStarSolver.a_star_search) with the
+        weights in turn, each one restarted from scratch and bounded to one
+        move less than the best solution so far, so it either finds a shorter
+        solution or proves there is none. A solution found with weight w is at
+        most w times longer than the optimal one, which gives its lower bound.
+
+        Weights close to 1 work best: the heuristic only looks at the target
+        robot, so under a high weight every helper move looks as good as the
+        next and the first search spreads over them instead of going deep.
+
+        The generator stops after the optimal solution, when the progress
+        callback cancels the search, or when there is no solution within
+        max_depth. Closing it between two solutions is fine too.
+
+        Args:
+            progress_callback (callable): Optional callback function to report progress
+                                        and check for cancellation
+
+        Yields:
+            dict: "moves" (list of (color, direction) moves), "length", "lower_bound"
+                  (no solution has fewer moves), "optimal" (length == lower_bound),
+                  "weight" of the search that found it, and "states_explored" so far.
+        """
+        start_state = self.codec.canonical(self.codec.pack(self.initial_positions))
+        lower_bound = self._heuristic(start_state)
+        if lower_bound == UNREACHABLE:
+            self.stats = {"expansions": 0, "generated": 0, "states_explored": 1}
+            if progress_callback:
+                progress_callback(1)
+            return
+
+        cancelled = False
+        states_explored = 0
+        totals = {"expansions": 0, "generated": 0, "pruned_moves": 0}
+
+        def search_progress_callback(search_states):
+            nonlocal cancelled
+            if progress_callback and not progress_callback(states_explored + search_states):
+                cancelled = True
+                return False
+            return True
+
+        best = None
+        best_weight = None
+        for weight in self.weights:
+            bound = self.max_depth if best is None else len(best) - 1
+            if bound < lower_bound:
+                break
+            moves = self.a_star_search(search_progress_callback, weight=weight, bound=bound)
+            states_explored += self.stats["states_explored"]
+            for key in totals:
+                totals[key] += self.stats[key]
+            if cancelled:
+                break
+            if moves is None:
+                # Every state within the bound was searched
+                lower_bound = bound + 1
+                break
+            best = moves
+            best_weight = weight
+            lower_bound = max(lower_bound, -(-len(moves) * WEIGHT_SCALE // round(weight * WEIGHT_SCALE)))
+            self._record_totals(totals, states_explored, weight)
+            yield self._result(best, lower_bound, best_weight, states_explored)
+            if lower_bound >= len(best):
+                return
+
+        self._record_totals(totals, states_explored, best_weight)
+        if best is not None and not cancelled and lower_bound >= len(best):
+            # The last search proved the best solution optimal without finding a new one
+            yield self._result(best, lower_bound, best_weight, states_explored)
+
+    def _result(self, moves, lower_bound, weight, states_explored):
+        return {
+            "moves": moves,
+            "length": len(moves),
+            "lower_bound": min(lower_bound, len(moves)),
+            "optimal": lower_bound >= len(moves),
+            "weight": weight,
+            "states_explored": states_explored,
+        }
+
+    def _record_totals(self, totals, states_explored, weight):
+        """Store the counters of all the searches so far, and the weight that found the best solution, in self.stats."""
+        expansions = totals["expansions"]
+        generated = totals["generated"]
+        self.stats = {
+            "expansions": expansions,
+            "generated": generated,
+            "states_explored": states_explored,
+            "pruned_moves": totals["pruned_moves"],
+            "branching_factor": generated / expansions if expansions else 0.0,
+            "unpruned_branching_factor": (generated + totals["pruned_moves"]) / expansions if expansions else 0.0,
+            "weight": weight,
+        }
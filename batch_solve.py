@@ -0,0 +1,394 @@
+"""
+Solve puzzles from the command line.
+
+Puzzles are read as JSON lines (see Puzzle.from_dict), one result line is
+written per puzzle as soon as it is solved:
+
+    python batch_solve.py puzzles.jsonl -o results.jsonl --solver robot_aware
+
+With --workers the puzzles are spread over a pool of processes:
+
+    python batch_solve.py puzzles.jsonl --workers 8 --unordered --timeout 60
+
+A reproducible corpus can be generated with:
+
+    python batch_solve.py --generate 1000 --seed 42 -o puzzles.jsonl
+
+Files ending in .rrp are read and generated in the binary puzzle format
+instead (see puzzle_file.py).
+"""
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import puzzle_file
+from game_core import Puzzle, PuzzleGenerator
+from shared_boards import SharedBoards, load_board
+from solution_cache import SolutionCache
+from solvers import SOLVERS, is_admissible, make_solver
+
+# Seconds a search may run past its timeout before it is interrupted, when its
+# solver doesn't check the progress callback often enough to stop by itself
+TIMEOUT_GRACE = 1.0
+
+
+class SearchInterrupted(Exception):
+    """Raised by the alarm of a search that overran its timeout, see run_solver."""
+
+
+def solve_puzzle(puzzle, solver_type="reachability", max_depth=30, timeout=None, cache=None):
+    """
+    Solve a single puzzle.
+
+    Args:
+        puzzle (Puzzle): The puzzle to solve.
+        solver_type (str): See make_solver.
+        max_depth (int): Maximum number of moves (depth) to search.
+        timeout (float): Seconds after which the search is cancelled, None for no limit.
+        cache (SolutionCache): Cache checked before solving and updated after, None for none.
+
+    Returns:
+        dict: "status" ('solved', 'unsolved' or 'timeout'), "moves" (list of
+              [color, direction], None if unsolved), "length", "states_explored",
+              "time" (wall time in seconds) and "cached".
+    """
+    start = time.perf_counter()
+    solver = make_solver(solver_type, puzzle, max_depth)
+    return run_solver(solver, timeout, cache, start)
+
+
+def run_solver(solver, timeout=None, cache=None, start=None):
+    """
+    Run a solver under a timeout, see solve_puzzle.
+
+    The search is cancelled through its progress callback once the timeout
+    has passed. Solvers that call it rarely (once per BFS layer or IDA*
+    iteration, say) could still overrun it by a whole phase, so in the main
+    thread of a process with SIGALRM (every pool worker on Unix) an alarm
+    also interrupts the search TIMEOUT_GRACE seconds after the timeout. The
+    per-process caches only ever store finished objects, so an interrupted
+    search leaves them usable.
+
+    Args:
+        solver (BaseSolver): The solver of the puzzle.
+        timeout (float): Seconds after which the search is cancelled, None for no limit.
+        cache (SolutionCache): Cache checked before solving and updated after, None for none.
+        start (float): time.perf_counter() when the timeout started, None for now.
+
+    Returns:
+        dict: The result fields, see solve_puzzle.
+    """
+    if start is None:
+        start = time.perf_counter()
+    progress_callback = None
+    alarm = (timeout is not None and hasattr(signal, "setitimer")
+             and threading.current_thread() is threading.main_thread())
+    if timeout is not None:
+        deadline = start + timeout
+
+        def progress_callback(states_explored):
+            return time.perf_counter() < deadline
+
+    if alarm:
+        previous_handler = signal.signal(signal.SIGALRM, _interrupt_search)
+        signal.setitimer(signal.ITIMER_REAL, max(deadline + TIMEOUT_GRACE - time.perf_counter(), 0.001))
+    try:
+        if cache is not None:
+            solution = cache.solve(solver, progress_callback)
+        else:
+            solution = solver.solve(progress_callback)
+        if alarm:
+            # Disarmed inside the try, so an alarm going off as the search returns is still caught
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    except SearchInterrupted:
+        solution = None
+    finally:
+        if alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+    elapsed = time.perf_counter() - start
+    if solution is not None:
+        status = "solved"
+    elif timeout is not None and elapsed >= timeout:
+        status = "timeout"
+    else:
+        status = "unsolved"
+    return solve_result(status, solution, solver.stats.get("states_explored", 0), elapsed,
+                        solver.stats.get("cache_hit", False))
+
+
+def _interrupt_search(signum, frame):
+    raise SearchInterrupted()
+
+
+def solve_result(status, solution, states_explored, elapsed, cached=False):
+    """Build the result fields of a puzzle, see solve_puzzle."""
+    return {
+        "status": status,
+        "moves": [list(move) for move in solution] if solution is not None else None,
+        "length": len(solution) if solution is not None else None,
+        "states_explored": states_explored,
+        "time": round(elapsed, 6),
+        "cached": cached,
+    }
+
+
+def read_puzzles(lines):
+    """
+    Lazily decode JSON lines into puzzles, skipping blank lines. A PuzzleFile
+    is read as is, see PuzzleFile.entries.
+
+    Yields:
+        (int, dict, Puzzle, str): Line number, decoded record, puzzle and error.
+                                  The error is None unless the line is not a valid puzzle,
+                                  in which case the puzzle is None.
+    """
+    if isinstance(lines, puzzle_file.PuzzleFile):
+        yield from lines.entries()
+        return
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        record = None
+        try:
+            record = json.loads(line)
+            yield line_number, record, Puzzle.from_dict(record), None
+        except (ValueError, KeyError, TypeError, AttributeError) as error:
+            yield line_number, record, None, f"invalid puzzle: {error}"
+
+
+def result_header(line_number, record):
+    """Fields identifying a puzzle in its result line: the line number and the puzzle id, if any."""
+    header = {"line": line_number}
+    if isinstance(record, dict) and "id" in record:
+        header["id"] = record["id"]
+    return header
+
+
+def solve_stream(lines, solver_type="reachability", max_depth=30, timeout=None, cache=None):
+    """
+    Solve the puzzles of a JSON lines stream one after the other.
+
+    Yields:
+        dict: One result per puzzle, in input order (see solve_puzzle), or an "error" for bad lines.
+    """
+    for line_number, record, puzzle, error in read_puzzles(lines):
+        result = result_header(line_number, record)
+        if error is not None:
+            result["error"] = error
+        else:
+            result.update(solve_puzzle(puzzle, solver_type, max_depth, timeout, cache))
+        yield result
+
+
+def _solve_task(board_name, robots, target_color, target_pos, solver_type, max_depth, timeout):
+    """Worker side of parallel_solve_stream: solve a puzzle whose board is in shared memory."""
+    try:
+        puzzle = Puzzle(load_board(board_name), robots, target_color, target_pos)
+        return solve_puzzle(puzzle, solver_type, max_depth, timeout)
+    except Exception as error:
+        return {"error": f"{type(error).__name__}: {error}"}
+
+
+def parallel_solve_stream(lines, solver_type="reachability", max_depth=30, workers=None,
+                          ordered=True, timeout=None, max_pending=None, cache=None):
+    """
+    Solve the puzzles of a JSON lines stream in a pool of worker processes.
+
+    Boards are published once per wall layout in shared memory (see
+    SharedBoards), so a task only carries the segment name, the robots and the
+    target. At most max_pending puzzles are read ahead of the results being
+    consumed, which keeps memory flat whatever the size of the input.
+
+    The cache, if any, is only used by this process: hits are answered without
+    a task, and the results of the workers are stored as they come back.
+
+    Args:
+        lines (iterable): JSON lines, one puzzle each.
+        solver_type (str): See make_solver.
+        max_depth (int): Maximum number of moves (depth) to search.
+        workers (int): Number of worker processes, None for one per CPU.
+        ordered (bool): Yield results in input order, otherwise as soon as they finish.
+        timeout (float): Seconds after which a single search is cancelled, None for no limit.
+        max_pending (int): Puzzles in flight or waiting to be yielded, 4 per worker by default.
+        cache (SolutionCache): Cache checked before solving and updated after, None for none.
+
+    Yields:
+        dict: One result per puzzle (see solve_stream).
+    """
+    workers = workers or os.cpu_count() or 1
+    optimal = is_admissible(solver_type)
+    if max_pending is None:
+        max_pending = 4 * workers
+    puzzles = read_puzzles(lines)
+    with SharedBoards() as boards, ProcessPoolExecutor(max_workers=workers) as executor:
+        running = {}
+        finished = {}
+        next_submitted = 0
+        next_yielded = 0
+        exhausted = False
+        while True:
+            # Read ahead until the window is full
+            while not exhausted and next_submitted - next_yielded < max_pending:
+                item = next(puzzles, None)
+                if item is None:
+                    exhausted = True
+                    break
+                line_number, record, puzzle, error = item
+                result = result_header(line_number, record)
+                entry = None
+                if error is None and cache is not None:
+                    start = time.perf_counter()
+                    entry = cache.get(puzzle.board, puzzle.robots, puzzle.target_color, puzzle.target_pos,
+                                      max_depth, optimal)
+                if error is not None:
+                    result["error"] = error
+                    finished[next_submitted] = result
+                elif entry is not None:
+                    status = "solved" if entry["moves"] is not None else "unsolved"
+                    result.update(solve_result(status, entry["moves"], 0, time.perf_counter() - start, True))
+                    finished[next_submitted] = result
+                else:
+                    board_name = boards.acquire(puzzle.board)
+                    future = executor.submit(_solve_task, board_name, puzzle.robots, puzzle.target_color,
+                                             puzzle.target_pos, solver_type, max_depth, timeout)
+                    running[future] = (next_submitted, result, board_name, puzzle)
+                next_submitted += 1
+
+            if ordered:
+                while next_yielded in finished:
+                    yield finished.pop(next_yielded)
+                    next_yielded += 1
+            else:
+                for sequence in list(finished):
+                    yield finished.pop(sequence)
+                    next_yielded += 1
+
+            if not running:
+                if exhausted and not finished:
+                    return
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                sequence, result, board_name, puzzle = running.pop(future)
+                boards.release(board_name)
+                result.update(future.result())
+                if cache is not None and result.get("status") in ("solved", "unsolved"):
+                    moves = [tuple(move) for move in result["moves"]] if result["moves"] is not None else None
+                    cache.put(puzzle.board, puzzle.robots, puzzle.target_color, puzzle.target_pos,
+                              moves, max_depth, optimal)
+                finished[sequence] = result
+
+
+class JsonlWriter:
+    def __init__(self, stream, flush_every=64, flush_interval=1.0):
+        """
+        Write records as JSON lines through a bounded buffer.
+
+        At most flush_every lines are held before they are written out, and
+        lines never wait longer than flush_interval seconds once a new record
+        comes in. Buffered lines wait for the next record, so streams of slow
+        results should use flush_every=1.
+
+        Args:
+            stream (file): Text stream to write to.
+            flush_every (int): Maximum number of buffered lines.
+            flush_interval (float): Maximum age in seconds of buffered lines.
+        """
+        self.stream = stream
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self.last_flush = time.monotonic()
+
+    def write(self, record):
+        self.buffer.append(json.dumps(record, separators=(",", ":")))
+        if len(self.buffer) >= self.flush_every or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.stream.write("\n".join(self.buffer) + "\n")
+            self.buffer.clear()
+        self.stream.flush()
+        self.last_flush = time.monotonic()
+
+
+def generate_puzzles(count, seed=None, puzzles_per_board=1):
+    """Yield count puzzle dicts from a seeded PuzzleGenerator, numbered by "id"."""
+    generator = PuzzleGenerator(seed)
+    for index, puzzle in enumerate(generator.puzzles(count, puzzles_per_board)):
+        yield {"id": index, **puzzle.to_dict()}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Solve Ricochet Robots puzzles from a JSON lines stream.")
+    parser.add_argument("input", nargs="?", default="-", help="puzzles file, '-' for stdin (default)")
+    parser.add_argument("-o", "--output", default="-", help="results file, '-' for stdout (default)")
+    parser.add_argument("--solver", choices=sorted(SOLVERS), default="reachability")
+    parser.add_argument("--max-depth", type=int, default=30)
+    parser.add_argument("--timeout", type=float, help="cancel a search after this many seconds")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of worker processes, 0 for one per CPU (default 1, no pool)")
+    parser.add_argument("--unordered", action="store_true",
+                        help="with --workers, write results as they finish instead of in input order")
+    parser.add_argument("--cache", metavar="PATH", help="SQLite solution cache to check first and update")
+    parser.add_argument("--cache-size", type=int, default=64, metavar="MB", help="size limit of the cache")
+    parser.add_argument("--flush-every", type=int,
+                        help="maximum number of buffered lines (default 1 when solving, 64 when generating)")
+    parser.add_argument("--generate", type=int, metavar="COUNT",
+                        help="write COUNT random puzzles instead of solving")
+    parser.add_argument("--seed", type=int, help="seed of the generated puzzles")
+    parser.add_argument("--puzzles-per-board", type=int, default=1)
+    return parser
+
+
+def open_stream(path, mode):
+    if path == "-":
+        return sys.stdin if "r" in mode else sys.stdout
+    return open(path, mode, encoding="utf-8")
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.generate is not None and args.output.endswith(puzzle_file.SUFFIX):
+        generator = PuzzleGenerator(args.seed)
+        puzzle_file.write_puzzles(args.output, generator.puzzles(args.generate, args.puzzles_per_board))
+        return
+    source = None
+    cache = SolutionCache(args.cache, args.cache_size << 20) if args.cache else None
+    output = open_stream(args.output, "w")
+    # Results are written as soon as they are ready, generated puzzles in batches
+    flush_every = args.flush_every or (64 if args.generate is not None else 1)
+    writer = JsonlWriter(output, flush_every)
+    try:
+        if args.generate is not None:
+            records = generate_puzzles(args.generate, args.seed, args.puzzles_per_board)
+        else:
+            if args.input.endswith(puzzle_file.SUFFIX):
+                source = puzzle_file.PuzzleFile(args.input)
+            else:
+                source = open_stream(args.input, "r")
+            if args.workers == 1:
+                records = solve_stream(source, args.solver, args.max_depth, args.timeout, cache)
+            else:
+                records = parallel_solve_stream(source, args.solver, args.max_depth, args.workers or None,
+                                                not args.unordered, args.timeout, cache=cache)
+        for record in records:
+            writer.write(record)
+    finally:
+        writer.flush()
+        if cache is not None:
+            cache.close()
+        for stream in (source, output):
+            if stream not in (None, sys.stdin, sys.stdout):
+                stream.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,587 @@
+"""
+Benchmark the solvers on a reproducible puzzle corpus.
+
+Build a corpus of seeded puzzles grouped by optimal solution length, run
+solvers on it, and compare two runs:
+
+    python benchmark.py corpus --seed 1 --per-group 5 -o corpus.jsonl
+    python benchmark.py run corpus.jsonl --solvers manhattan reachability -o base.json
+    python benchmark.py compare base.json new.json --threshold 0.1
+
+The check-pruning command guards the move pruning of the A* solvers: it
+solves seeded puzzles with and without it and fails if a length differs.
+
+The corpus is a JSON lines file that batch_solve.py also reads. The same
+version, seed and options always give the same corpus: puzzles come from
+PuzzleGenerator and searches are limited by expansions, not by time.
+"""
+import argparse
+import json
+import math
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import all_targets
+import board
+from budget import BUDGET_EXHAUSTED, SOLVED, SearchBudget
+from distance_tables import distance_cache
+from game_core import PuzzleGenerator
+from batch_solve import TIMEOUT_GRACE, JsonlWriter, open_stream, parallel_solve_stream, read_puzzles, run_solver
+from reachability_a_star import ReachabilityAStarSolver
+from solver_base import BaseSolver
+from solvers import SOLVERS, make_solver
+
+# Bump when the generator or the corpus format changes, so runs on different corpora aren't compared
+CORPUS_VERSION = 1
+# Solutions of this length and longer share the last group
+LONGEST_GROUP = 15
+DEFAULT_SOLVERS = ("manhattan", "reachability", "robot_aware")
+# The traced memory run gets this many times the timeout, tracemalloc slows searches down several times
+TRACE_TIMEOUT_FACTOR = 10
+# Admissible solver types searched by BaseAStarSolver.a_star_search, whose move pruning
+# check_pruning checks; the Manhattan heuristic isn't admissible, so its lengths vary anyway
+PRUNING_SOLVERS = ("reachability", "robot_aware")
+# Seconds a search may end after its timeout and TIMEOUT_GRACE before check_timeouts counts an overrun
+TIMEOUT_SLACK = 0.5
+# Seconds the StallingSolver of check_timeouts runs if nothing stops it
+STALL_TIME = 30.0
+
+
+def length_group(length):
+    """Name of the corpus group of an optimal solution length: '1' to '14', then '15+'."""
+    return f"{LONGEST_GROUP}+" if length >= LONGEST_GROUP else str(length)
+
+
+def group_order(group):
+    return int(group.rstrip("+"))
+
+
+def build_corpus(seed=0, per_group=5, max_attempts=5000, max_expansions=2000000, progress=None):
+    """
+    Generate puzzles until every length group has per_group of them.
+
+    Each puzzle is solved optimally by the robot-aware A*. Puzzles it can't
+    solve within max_expansions are skipped, which keeps the corpus
+    independent of the machine. Long solutions are rare, so the longest
+    groups may stay short after max_attempts puzzles.
+
+    Args:
+        seed (int): Seed of the PuzzleGenerator.
+        per_group (int): Puzzles wanted per length group.
+        max_attempts (int): Number of puzzles generated before giving up on the missing ones.
+        max_expansions (int): Expansion limit of the reference search.
+        progress (callable): Optional callback taking the attempt number and the group sizes.
+
+    Returns:
+        list: Puzzle records (Puzzle.to_dict plus "id", "corpus_version", "group" and
+              "length"), sorted by length.
+    """
+    generator = PuzzleGenerator(seed)
+    groups = {length_group(length): [] for length in range(1, LONGEST_GROUP + 1)}
+    for attempt in range(max_attempts):
+        puzzle = generator.new_puzzle()
+        solver = ReachabilityAStarSolver(puzzle.board, puzzle.robots, puzzle.target_color, puzzle.target_pos,
+                                         heuristic="robot_aware")
+        result = solver.search(SearchBudget(max_expansions=max_expansions))
+        if progress:
+            progress(attempt, {group: len(records) for group, records in groups.items()})
+        if result.status != SOLVED or not result.moves:
+            continue
+        group = length_group(len(result.moves))
+        if len(groups[group]) < per_group:
+            groups[group].append({
+                "id": f"v{CORPUS_VERSION}-{seed}-{attempt}",
+                "corpus_version": CORPUS_VERSION,
+                "group": group,
+                "length": len(result.moves),
+                **puzzle.to_dict(),
+            })
+            if all(len(records) >= per_group for records in groups.values()):
+                break
+    return sorted((record for records in groups.values() for record in records),
+                  key=lambda record: (record["length"], record["id"]))
+
+
+def clear_caches():
+    """Empty the per-process caches of compiled boards, distance tables and searches."""
+    board._compiled_boards.clear()
+    distance_cache.clear()
+    all_targets._searches.clear()
+
+
+def deadline_callback(timeout):
+    """Return a progress callback cancelling the search timeout seconds from now, None for no limit."""
+    if timeout is None:
+        return None
+    deadline = time.perf_counter() + timeout
+
+    def progress_callback(states_explored):
+        return time.perf_counter() < deadline
+
+    return progress_callback
+
+
+def measure(solver_type, puzzle, max_depth=30, timeout=None, repeat=1, trace_memory=False):
+    """
+    Solve a puzzle with a solver, repeat times, keeping the fastest run.
+
+    Every run starts with empty caches (see clear_caches), so it includes
+    building the board tables and repeats don't just hit the cache.
+
+    Args:
+        solver_type (str): See make_solver.
+        puzzle (Puzzle): The puzzle to solve.
+        max_depth (int): Maximum number of moves (depth) to search.
+        timeout (float): Seconds after which a run is cancelled, None for no limit.
+        repeat (int): Number of timed runs.
+        trace_memory (bool): Run once more under tracemalloc to measure the peak memory,
+                             with TRACE_TIMEOUT_FACTOR times the timeout since tracing is slow.
+
+    Returns:
+        dict: "status" ('solved', 'unsolved' or 'timeout'), "length", "time" (seconds,
+              the timeout for cancelled runs), "expansions", "nodes_per_second"
+              and "peak_memory" (bytes, None unless traced; runs that timed out
+              and traced runs that didn't finish aren't traced).
+    """
+    best = None
+    for _ in range(repeat):
+        clear_caches()
+        start = time.perf_counter()
+        solver = make_solver(solver_type, puzzle, max_depth)
+        solution = solver.solve(deadline_callback(timeout))
+        elapsed = time.perf_counter() - start
+        if solution is not None:
+            status = "solved"
+        elif timeout is not None and elapsed >= timeout:
+            status = "timeout"
+            elapsed = timeout
+        else:
+            status = "unsolved"
+        expansions = solver.stats.get("expansions", 0)
+        run = {
+            "status": status,
+            "length": len(solution) if solution is not None else None,
+            "time": elapsed,
+            "expansions": expansions,
+            "nodes_per_second": expansions / elapsed if elapsed > 0 else 0.0,
+            "peak_memory": None,
+        }
+        if best is None or run["time"] < best["time"]:
+            best = run
+        if status == "timeout":
+            break
+
+    if trace_memory and best["status"] != "timeout":
+        # A separate run, since tracing distorts the timings
+        clear_caches()
+        cancelled = False
+        trace_callback = deadline_callback(None if timeout is None else timeout * TRACE_TIMEOUT_FACTOR)
+
+        def progress_callback(states_explored):
+            nonlocal cancelled
+            if trace_callback and not trace_callback(states_explored):
+                cancelled = True
+                return False
+            return True
+
+        tracemalloc.start()
+        try:
+            make_solver(solver_type, puzzle, max_depth).solve(progress_callback)
+            if not cancelled:
+                best["peak_memory"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return best
+
+
+def run_benchmark(records, solver_types=DEFAULT_SOLVERS, max_depth=30, timeout=60.0, repeat=1,
+                  trace_memory=False, progress=None):
+    """
+    Measure every solver on every corpus puzzle.
+
+    Args:
+        records (list): (line number, record, puzzle) of the corpus puzzles.
+        solver_types (tuple): Solvers to run (keys of SOLVERS).
+        max_depth (int), timeout (float), repeat (int), trace_memory (bool): See measure.
+        progress (callable): Optional callback taking each measurement once done.
+
+    Returns:
+        dict: The run: "corpus_version", "settings", "machine", the raw "measurements"
+              and their "summary" (see summarize).
+    """
+    measurements = []
+    for solver_type in solver_types:
+        for _, record, puzzle in records:
+            measurement = measure(solver_type, puzzle, max_depth, timeout, repeat, trace_memory)
+            measurement.update(solver=solver_type, id=record.get("id"), group=record.get("group"))
+            if record.get("length") is not None and measurement["length"] not in (None, record["length"]):
+                # Not an error for inadmissible solvers, worth seeing for the others
+                measurement["suboptimal"] = True
+            measurements.append(measurement)
+            if progress:
+                progress(measurement)
+    return {
+        "corpus_version": sorted({record.get("corpus_version") for _, record, _ in records}, key=str),
+        "settings": {"solvers": list(solver_types), "max_depth": max_depth, "timeout": timeout,
+                     "repeat": repeat, "trace_memory": trace_memory},
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "processor": platform.processor()},
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "measurements": measurements,
+        "summary": summarize(measurements),
+    }
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def summarize(measurements):
+    """
+    Aggregate measurements by solver and length group, plus an "all" group per solver.
+
+    Returns:
+        dict: {solver: {group: {"count", "timeouts", "median_time", "p95_time",
+                                "median_expansions", "median_nodes_per_second",
+                                "max_peak_memory"}}}
+    """
+    grouped = {}
+    for measurement in measurements:
+        solver_groups = grouped.setdefault(measurement["solver"], {})
+        for group in (measurement["group"] or "?", "all"):
+            solver_groups.setdefault(group, []).append(measurement)
+    summary = {}
+    for solver_type, solver_groups in grouped.items():
+        summary[solver_type] = {}
+        for group, group_measurements in solver_groups.items():
+            times = [measurement["time"] for measurement in group_measurements]
+            memories = [measurement["peak_memory"] for measurement in group_measurements
+                        if measurement["peak_memory"] is not None]
+            summary[solver_type][group] = {
+                "count": len(group_measurements),
+                "timeouts": sum(measurement["status"] == "timeout" for measurement in group_measurements),
+                "median_time": statistics.median(times),
+                "p95_time": percentile(times, 0.95),
+                "median_expansions": statistics.median(
+                    measurement["expansions"] for measurement in group_measurements),
+                "median_nodes_per_second": statistics.median(
+                    measurement["nodes_per_second"] for measurement in group_measurements),
+                "max_peak_memory": max(memories) if memories else None,
+            }
+    return summary
+
+
+def compare_runs(base, new, threshold=0.1, min_time=0.005):
+    """
+    Compare the median and p95 times of two runs, group by group.
+
+    Args:
+        base (dict): The reference run (see run_benchmark).
+        new (dict): The run to check.
+        threshold (float): Relative slowdown above which a time counts as a regression.
+        min_time (float): Differences below this many seconds are noise, never regressions.
+
+    Returns:
+        list: One dict per solver, group and metric present in both runs: "solver", "group",
+              "metric", "base", "new", "ratio" (new / base) and "regression".
+    """
+    rows = []
+    for solver_type, groups in new["summary"].items():
+        base_groups = base["summary"].get(solver_type, {})
+        for group, stats in groups.items():
+            base_stats = base_groups.get(group)
+            if base_stats is None:
+                continue
+            for metric in ("median_time", "p95_time"):
+                base_value, new_value = base_stats[metric], stats[metric]
+                ratio = new_value / base_value if base_value > 0 else math.inf
+                rows.append({
+                    "solver": solver_type,
+                    "group": group,
+                    "metric": metric,
+                    "base": base_value,
+                    "new": new_value,
+                    "ratio": ratio,
+                    "regression": ratio > 1 + threshold and new_value - base_value > min_time,
+                })
+    return rows
+
+
+def format_summary(summary):
+    lines = [f"{'solver':<14}{'group':>6}{'count':>7}{'timeouts':>9}{'median s':>11}{'p95 s':>10}"
+             f"{'expansions':>12}{'nodes/s':>10}{'peak MB':>9}"]
+    for solver_type, groups in summary.items():
+        for group in sorted(groups, key=lambda group: (group == "all", group_order(group) if group[0].isdigit() else 0)):
+            stats = groups[group]
+            memory = "-" if stats["max_peak_memory"] is None else f"{stats['max_peak_memory'] / (1 << 20):.1f}"
+            lines.append(f"{solver_type:<14}{group:>6}{stats['count']:>7}{stats['timeouts']:>9}"
+                         f"{stats['median_time']:>11.4f}{stats['p95_time']:>10.4f}"
+                         f"{stats['median_expansions']:>12.0f}{stats['median_nodes_per_second']:>10.0f}{memory:>9}")
+    return "\n".join(lines)
+
+
+def format_comparison(rows):
+    lines = [f"{'solver':<14}{'group':>6}{'metric':>13}{'base s':>10}{'new s':>10}{'ratio':>8}"]
+    for row in rows:
+        flag = "  REGRESSION" if row["regression"] else ""
+        lines.append(f"{row['solver']:<14}{row['group']:>6}{row['metric']:>13}{row['base']:>10.4f}"
+                     f"{row['new']:>10.4f}{row['ratio']:>8.2f}{flag}")
+    return "\n".join(lines)
+
+
+def check_pruning(seed=0, count=50, solver_types=PRUNING_SOLVERS, max_depth=30, max_expansions=300000,
+                  progress=None):
+    """
+    Compare the solution lengths of A* searches with and without move pruning.
+
+    Pruning skips moves that can't start a shorter path (see
+    BaseSolver._successors), so it must never change the optimal length.
+    Puzzles where either search runs out of expansions are skipped.
+
+    Args:
+        seed (int): Seed of the PuzzleGenerator.
+        count (int): Number of puzzles.
+        solver_types (tuple): A* solver types to check (keys of SOLVERS).
+        max_depth (int): Maximum number of moves (depth) to search.
+        max_expansions (int): Expansion limit of each search.
+        progress (callable): Optional callback taking each comparison once done.
+
+    Returns:
+        list: One dict per puzzle and solver: "puzzle" (index), "solver", "pruned" and
+              "unpruned" (solution lengths, None without a solution, 'budget' when
+              skipped) and "mismatch".
+    """
+    comparisons = []
+    for index, puzzle in enumerate(PuzzleGenerator(seed).puzzles(count)):
+        for solver_type in solver_types:
+            lengths = []
+            for prune_moves in (True, False):
+                result = make_solver(solver_type, puzzle, max_depth).search(
+                    SearchBudget(max_expansions=max_expansions), prune_moves=prune_moves)
+                if result.status == BUDGET_EXHAUSTED:
+                    lengths.append("budget")
+                elif result.moves is None:
+                    lengths.append(None)
+                elif not puzzle.is_solved_by(result.moves):
+                    lengths.append("invalid")
+                else:
+                    lengths.append(len(result.moves))
+            comparison = {
+                "puzzle": index,
+                "solver": solver_type,
+                "pruned": lengths[0],
+                "unpruned": lengths[1],
+                "mismatch": "budget" not in lengths and (lengths[0] != lengths[1] or "invalid" in lengths),
+            }
+            comparisons.append(comparison)
+            if progress:
+                progress(comparison)
+    return comparisons
+
+
+class StallingSolver(BaseSolver):
+    """Solver whose search never calls its progress callback, like a long BFS layer or IDA* iteration."""
+
+    def solve(self, progress_callback=None):
+        end = time.perf_counter() + STALL_TIME
+        while time.perf_counter() < end:
+            pass
+        self.stats = {"expansions": 0, "generated": 0, "states_explored": 0}
+        return None
+
+
+def check_timeouts(seed=0, count=10, solver_types=tuple(SOLVERS), timeout=0.2, max_depth=30, workers=None,
+                   progress=None):
+    """
+    Check that searches stop at their timeout, in batch_solve's process pool.
+
+    A StallingSolver runs first, in this process and in a pool worker: it
+    must come back as a timeout even though it never checks for one (see
+    batch_solve.run_solver). Then seeded puzzles are solved with each solver
+    type through parallel_solve_stream. A search overruns when it takes more
+    than timeout + TIMEOUT_GRACE + TIMEOUT_SLACK seconds.
+
+    Args:
+        seed (int): Seed of the PuzzleGenerator.
+        count (int): Number of puzzles.
+        solver_types (tuple): Solver types to check (keys of SOLVERS).
+        timeout (float): Seconds per search.
+        max_depth (int): Maximum number of moves (depth) to search.
+        workers (int): Number of worker processes, None for one per CPU.
+        progress (callable): Optional callback taking each check once done.
+
+    Returns:
+        list: One dict per search: "solver", "puzzle" (index), "status", "time" and "overrun".
+    """
+    puzzles = list(PuzzleGenerator(seed).puzzles(count))
+    limit = timeout + TIMEOUT_GRACE + TIMEOUT_SLACK
+    checks = []
+
+    def check(solver_name, index, result, expected_status=None):
+        status = result.get("status", "error")
+        entry = {
+            "solver": solver_name,
+            "puzzle": index,
+            "status": status,
+            "time": result.get("time"),
+            "overrun": (result.get("time") is None or result["time"] > limit
+                        or (expected_status is not None and status != expected_status)),
+        }
+        checks.append(entry)
+        if progress:
+            progress(entry)
+
+    puzzle = puzzles[0]
+    solver = StallingSolver(puzzle.board, puzzle.robots, puzzle.target_color, puzzle.target_pos, max_depth)
+    check("stalling (this process)", 0, run_solver(solver, timeout), "timeout")
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        check("stalling (pool)", 0, executor.submit(run_solver, solver, timeout).result(), "timeout")
+
+    lines = [json.dumps(puzzle.to_dict()) for puzzle in puzzles]
+    for solver_type in solver_types:
+        for index, result in enumerate(parallel_solve_stream(lines, solver_type, max_depth, workers,
+                                                             timeout=timeout)):
+            check(solver_type, index, result)
+    return checks
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the Ricochet Robots solvers.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    corpus = commands.add_parser("corpus", help="generate a corpus grouped by optimal solution length")
+    corpus.add_argument("-o", "--output", default="-", help="corpus file, '-' for stdout (default)")
+    corpus.add_argument("--seed", type=int, default=0)
+    corpus.add_argument("--per-group", type=int, default=5, help="puzzles per solution length")
+    corpus.add_argument("--max-attempts", type=int, default=5000)
+    corpus.add_argument("--max-expansions", type=int, default=2000000,
+                        help="skip puzzles the reference search can't solve within this many expansions")
+
+    run = commands.add_parser("run", help="run solvers on a corpus")
+    run.add_argument("corpus", help="corpus file, '-' for stdin")
+    run.add_argument("-o", "--output", help="write the run as JSON to this file")
+    run.add_argument("--solvers", nargs="+", choices=sorted(SOLVERS), default=list(DEFAULT_SOLVERS))
+    run.add_argument("--groups", nargs="+", help="only run these length groups, e.g. 5 6 15+")
+    run.add_argument("--max-depth", type=int, default=30)
+    run.add_argument("--timeout", type=float, default=60.0, help="seconds per puzzle, counted as the time")
+    run.add_argument("--repeat", type=int, default=1, help="timed runs per puzzle, the fastest is kept")
+    run.add_argument("--memory", action="store_true", help="measure peak memory in an extra traced run")
+
+    check = commands.add_parser("check-pruning", help="check that move pruning keeps the A* solutions optimal")
+    check.add_argument("--seed", type=int, default=0)
+    check.add_argument("--count", type=int, default=50, help="number of puzzles")
+    check.add_argument("--solvers", nargs="+", choices=PRUNING_SOLVERS, default=list(PRUNING_SOLVERS))
+    check.add_argument("--max-depth", type=int, default=30)
+    check.add_argument("--max-expansions", type=int, default=300000,
+                       help="skip puzzles a search can't finish within this many expansions")
+
+    timeouts = commands.add_parser("check-timeouts", help="check that batch searches stop at their timeout")
+    timeouts.add_argument("--seed", type=int, default=0)
+    timeouts.add_argument("--count", type=int, default=10, help="number of puzzles")
+    timeouts.add_argument("--solvers", nargs="+", choices=sorted(SOLVERS), default=sorted(SOLVERS))
+    timeouts.add_argument("--timeout", type=float, default=0.2, help="seconds per search")
+    timeouts.add_argument("--max-depth", type=int, default=30)
+    timeouts.add_argument("--workers", type=int, help="worker processes, one per CPU by default")
+
+    compare = commands.add_parser("compare", help="compare two runs and flag regressions")
+    compare.add_argument("base", help="reference run file")
+    compare.add_argument("new", help="run file to check")
+    compare.add_argument("--threshold", type=float, default=0.1,
+                         help="relative slowdown counted as a regression (default 0.1)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "corpus":
+        def progress(attempt, sizes):
+            if attempt % 100 == 0:
+                print(f"{attempt} puzzles tried, group sizes {sizes}", file=sys.stderr)
+
+        records = build_corpus(args.seed, args.per_group, args.max_attempts, args.max_expansions, progress)
+        output = open_stream(args.output, "w")
+        writer = JsonlWriter(output)
+        try:
+            for record in records:
+                writer.write(record)
+        finally:
+            writer.flush()
+            if output is not sys.stdout:
+                output.close()
+        return 0
+
+    if args.command == "run":
+        source = open_stream(args.corpus, "r")
+        try:
+            records = []
+            for line_number, record, puzzle, error in read_puzzles(source):
+                if error is not None:
+                    raise SystemExit(f"{args.corpus}:{line_number}: {error}")
+                if args.groups is None or record.get("group") in args.groups:
+                    records.append((line_number, record, puzzle))
+        finally:
+            if source is not sys.stdin:
+                source.close()
+
+        def progress(measurement):
+            print(f"{measurement['solver']} {measurement['id']}: {measurement['status']} "
+                  f"in {measurement['time']:.3f}s", file=sys.stderr)
+
+        result = run_benchmark(records, args.solvers, args.max_depth, args.timeout, args.repeat, args.memory,
+                               progress)
+        print(format_summary(result["summary"]))
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as file:
+                json.dump(result, file, indent=1)
+        return 0
+
+    if args.command == "check-pruning":
+        def progress(comparison):
+            flag = "  MISMATCH" if comparison["mismatch"] else ""
+            print(f"puzzle {comparison['puzzle']} {comparison['solver']}: {comparison['pruned']} pruned, "
+                  f"{comparison['unpruned']} unpruned{flag}")
+
+        comparisons = check_pruning(args.seed, args.count, args.solvers, args.max_depth, args.max_expansions,
+                                    progress)
+        mismatches = sum(comparison["mismatch"] for comparison in comparisons)
+        skipped = sum("budget" in (comparison["pruned"], comparison["unpruned"]) for comparison in comparisons)
+        print(f"{len(comparisons) - skipped} compared, {skipped} skipped, {mismatches} mismatch(es)",
+              file=sys.stderr)
+        return 1 if mismatches else 0
+
+    if args.command == "check-timeouts":
+        def progress(check):
+            flag = "  OVERRUN" if check["overrun"] else ""
+            print(f"{check['solver']} puzzle {check['puzzle']}: {check['status']} in {check['time']}s{flag}")
+
+        checks = check_timeouts(args.seed, args.count, tuple(args.solvers), args.timeout, args.max_depth,
+                                args.workers, progress)
+        overruns = sum(check["overrun"] for check in checks)
+        timed_out = sum(check["status"] == "timeout" for check in checks)
+        print(f"{len(checks)} searches, {timed_out} timed out, {overruns} overrun(s)", file=sys.stderr)
+        return 1 if overruns else 0
+
+    with open(args.base, encoding="utf-8") as file:
+        base = json.load(file)
+    with open(args.new, encoding="utf-8") as file:
+        new = json.load(file)
+    if base["corpus_version"] != new["corpus_version"]:
+        print(f"warning: corpus versions differ ({base['corpus_version']} and {new['corpus_version']})",
+              file=sys.stderr)
+    rows = compare_runs(base, new, args.threshold)
+    print(format_comparison(rows))
+    regressions = sum(row["regression"] for row in rows)
+    if regressions:
+        print(f"{regressions} regression(s) above {args.threshold:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
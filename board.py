@@ -0,0 +1,195 @@
+import hashlib
+from collections import OrderedDict
+
+DIRECTIONS = ("N", "S", "E", "W")
+DIRECTION_INDEX = {direction: index for index, direction in enumerate(DIRECTIONS)}
+OPPOSITE = {"N": "S", "S": "N", "E": "W", "W": "E"}
+# MASK_DIRECTIONS[mask]: the directions of the walls in a 4-bit wall mask
+MASK_DIRECTIONS = tuple(
+    tuple(direction for d, direction in enumerate(DIRECTIONS) if mask >> d & 1) for mask in range(16)
+)
+# Byte translation tables used to pack two wall masks per byte
+_HIGH_NIBBLE = bytes((value << 4) & 0xFF for value in range(256))
+_LOW_NIBBLE = bytes(value & 0x0F for value in range(256))
+_TO_LOW_NIBBLE = bytes(value >> 4 for value in range(256))
+
+
+class CompiledBoard:
+    def __init__(self, board):
+        """
+        Precompute the ricochet tables of a board so robot moves don't have to
+        walk the board one cell at a time.
+
+        Cells are addressed by a flat index (row * cols + col) and directions by
+        their index in DIRECTIONS. For every (cell, direction) pair we store the
+        cell where a lone robot stops (walls only) and the ray of cells it slides
+        over, so blocking robots can be resolved with one lookup each.
+
+        Args:
+            board (list): 2D list representing the game board cells. Each cell is a dict with "walls".
+        """
+        self.rows = len(board)
+        self.cols = len(board[0])
+        self.num_cells = self.rows * self.cols
+        self.wall_masks = wall_masks(board)
+        # Stable hash of the wall layout, used to key per-board caches
+        self.layout_key = hashlib.blake2b(
+            bytes([self.rows, self.cols]) + self.wall_masks, digest_size=16
+        ).hexdigest()
+        self.deltas = (-self.cols, self.cols, 1, -1)
+
+        # neighbors[cell * 4 + d]: adjacent cell in direction d, or -1 if a wall or the edge is in the way
+        self.neighbors = [-1] * (self.num_cells * 4)
+        for row in range(self.rows):
+            for col in range(self.cols):
+                cell = row * self.cols + col
+                for d, direction in enumerate(DIRECTIONS):
+                    if direction in board[row][col]["walls"]:
+                        continue
+                    next_row = row + (d == 1) - (d == 0)
+                    next_col = col + (d == 2) - (d == 3)
+                    if not (0 <= next_row < self.rows and 0 <= next_col < self.cols):
+                        continue
+                    if OPPOSITE[direction] in board[next_row][next_col]["walls"]:
+                        continue
+                    self.neighbors[cell * 4 + d] = next_row * self.cols + next_col
+
+        # stops[cell * 4 + d]: wall-only stop cell
+        # rays[cell * 4 + d]: {cell on the ray: number of steps from the start cell}
+        self.stops = [0] * (self.num_cells * 4)
+        self.rays = [None] * (self.num_cells * 4)
+        for cell in range(self.num_cells):
+            for d in range(4):
+                ray = {}
+                current = cell
+                steps = 0
+                while True:
+                    next_cell = self.neighbors[current * 4 + d]
+                    if next_cell < 0:
+                        break
+                    steps += 1
+                    ray[next_cell] = steps
+                    current = next_cell
+                self.stops[cell * 4 + d] = current
+                self.rays[cell * 4 + d] = ray
+
+    def index(self, pos):
+        """Return the flat cell index of a (row, col) position."""
+        return pos[0] * self.cols + pos[1]
+
+    def position(self, cell):
+        """Return the (row, col) position of a flat cell index."""
+        return divmod(cell, self.cols)
+
+    def slide(self, cell, direction, robot_cells):
+        """
+        Compute where a robot stops when it slides from a cell.
+
+        Args:
+            cell (int): Flat index of the moving robot.
+            direction (int): Index of the direction in DIRECTIONS.
+            robot_cells (iterable): Flat indices of the other robots. The moving
+                                    robot's own cell may be included, it is never on its ray.
+
+        Returns:
+            int: Flat index of the stop cell (equal to cell if the robot can't move).
+        """
+        key = cell * 4 + direction
+        ray = self.rays[key]
+        nearest = 0
+        for other in robot_cells:
+            steps = ray.get(other)
+            if steps and (not nearest or steps < nearest):
+                nearest = steps
+        if not nearest:
+            return self.stops[key]
+        return cell + self.deltas[direction] * (nearest - 1)
+
+    def move_position(self, pos, direction, other_positions=()):
+        """
+        Compute where a robot stops when it moves from a (row, col) position.
+
+        Args:
+            pos (tuple): The robot position (row, col).
+            direction (str): Direction to move: 'N', 'S', 'E', or 'W'.
+            other_positions (iterable): Positions (row, col) of the other robots.
+
+        Returns:
+            tuple: The stop position (row, col).
+        """
+        cell = self.slide(
+            self.index(pos),
+            DIRECTION_INDEX[direction],
+            [self.index(other) for other in other_positions],
+        )
+        return self.position(cell)
+
+
+def wall_masks(board):
+    """
+    Encode the walls of every cell as a 4-bit mask (bit d set for DIRECTIONS[d]).
+
+    Returns:
+        bytes: One mask per cell, in flat cell order.
+    """
+    return bytes(
+        sum(1 << d for d, direction in enumerate(DIRECTIONS) if direction in cell["walls"])
+        for row in board
+        for cell in row
+    )
+
+
+def board_from_wall_masks(rows, cols, masks):
+    """
+    Rebuild a board from the wall masks produced by wall_masks.
+
+    Returns:
+        list: 2D list of cells, each a dict with a "walls" set of directions.
+    """
+    return [
+        [{"walls": set(MASK_DIRECTIONS[masks[row * cols + col]])} for col in range(cols)]
+        for row in range(rows)
+    ]
+
+
+def pack_wall_masks(masks):
+    """
+    Pack wall masks two per byte, the first cell of each pair in the low nibble.
+
+    Returns:
+        bytes: (len(masks) + 1) // 2 bytes.
+    """
+    size = (len(masks) + 1) // 2
+    low = int.from_bytes(masks[0::2], "little")
+    high = int.from_bytes(bytes(masks[1::2]).translate(_HIGH_NIBBLE), "little")
+    return (low | high).to_bytes(size, "little")
+
+
+def unpack_wall_masks(packed, num_cells):
+    """Inverse of pack_wall_masks: one wall mask byte per cell."""
+    masks = bytearray(2 * len(packed))
+    masks[0::2] = bytes(packed).translate(_LOW_NIBBLE)
+    masks[1::2] = bytes(packed).translate(_TO_LOW_NIBBLE)
+    return bytes(masks[:num_cells])
+
+
+# Boards compiled by compile_board, least recently used first
+_compiled_boards = OrderedDict()
+MAX_COMPILED_BOARDS = 32
+
+
+def compile_board(board):
+    """
+    Return the CompiledBoard of a board, reusing the one built for an identical
+    wall layout if it is still in the LRU cache.
+    """
+    key = (len(board), len(board[0]), wall_masks(board))
+    compiled_board = _compiled_boards.get(key)
+    if compiled_board is None:
+        compiled_board = CompiledBoard(board)
+        _compiled_boards[key] = compiled_board
+        if len(_compiled_boards) > MAX_COMPILED_BOARDS:
+            _compiled_boards.popitem(last=False)
+    else:
+        _compiled_boards.move_to_end(key)
+    return compiled_board
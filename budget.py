@@ -0,0 +1,100 @@
+import time
+
+# Statuses of a SearchResult
+SOLVED = "solved"
+# Every state within max_depth was searched: there is no solution with at most max_depth moves
+UNSOLVABLE = "unsolvable"
+BUDGET_EXHAUSTED = "budget_exhausted"
+CANCELLED = "cancelled"
+
+# Approximate bytes per search node on top of NodeStore.nbytes(): the visited dict
+# entry with its int key and value, the open list entry and the node flags
+NODE_OVERHEAD_BYTES = 120
+
+
+class SearchBudget:
+    def __init__(self, time_limit=None, max_expansions=None, max_memory=None):
+        """
+        Hard limits of a search. A limit left to None doesn't apply.
+
+        Args:
+            time_limit (float): Wall-clock seconds from the start of the search.
+            max_expansions (int): Number of node expansions.
+            max_memory (int): Approximate bytes of the visited, node and open list
+                              structures and of the heuristic memos (see estimate_memory).
+        """
+        self.time_limit = time_limit
+        self.max_expansions = max_expansions
+        self.max_memory = max_memory
+        self.deadline = None
+
+    def start(self):
+        """Start the clock; called by the search when it begins."""
+        if self.time_limit is not None:
+            self.deadline = time.perf_counter() + self.time_limit
+
+    def exhausted(self, expansions, memory):
+        """
+        Check the limits.
+
+        Args:
+            expansions (int): Nodes expanded so far.
+            memory (int): Approximate bytes used so far.
+
+        Returns:
+            str: 'time', 'expansions' or 'memory' for the first limit reached, None if none is.
+        """
+        if self.max_expansions is not None and expansions >= self.max_expansions:
+            return "expansions"
+        if self.max_memory is not None and memory >= self.max_memory:
+            return "memory"
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            return "time"
+        return None
+
+
+def estimate_memory(nodes, heuristic_memory=0):
+    """
+    Approximate bytes used by a search. It stays below the peak measured by
+    tracemalloc, by about 10% on 4-robot 16x16 searches, mostly dict resizes.
+
+    Args:
+        nodes (NodeStore): The nodes of the search.
+        heuristic_memory (int): Bytes of the solver's heuristic memos (see BaseSolver._heuristic_memory).
+    """
+    return nodes.nbytes() + len(nodes) * NODE_OVERHEAD_BYTES + heuristic_memory
+
+
+class SearchResult:
+    def __init__(self, status, moves=None, lower_bound=0, partial_moves=None, distance_left=None,
+                 exhausted=None, stats=None):
+        """
+        Outcome of a search, with what was learned even when it didn't finish.
+
+        Args:
+            status (str): SOLVED, UNSOLVABLE, BUDGET_EXHAUSTED or CANCELLED.
+            moves (list): The (color, direction) moves of the solution, None unless solved.
+            lower_bound (int): No solution has fewer moves (the solution length once solved).
+            partial_moves (list): Moves to the state closest to the target by the heuristic.
+            distance_left (int): Heuristic estimate of the moves left after partial_moves.
+            exhausted (str): The limit that stopped the search (see SearchBudget.exhausted).
+            stats (dict): The solver's stats.
+        """
+        self.status = status
+        self.moves = moves
+        self.lower_bound = lower_bound
+        self.partial_moves = partial_moves
+        self.distance_left = distance_left
+        self.exhausted = exhausted
+        self.stats = stats if stats is not None else {}
+
+    def to_dict(self):
+        """Return the result as JSON-compatible data."""
+        return {
+            "status": self.status,
+            "moves": [list(move) for move in self.moves] if self.moves is not None else None,
+            "lower_bound": self.lower_bound,
+            "partial_moves": [list(move) for move in self.partial_moves] if self.partial_moves is not None else None,
+            "distance_left": self.distance_left,
+            "exhausted": self.exhausted,
+        }
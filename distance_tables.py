@@ -0,0 +1,115 @@
+from array import array
+from collections import OrderedDict, deque
+
+# Distance of cells from which the target can't be reached at all
+UNREACHABLE = 255
+
+
+def target_distances(compiled_board, target_cell):
+    """
+    Compute the minimum number of moves from every cell to a target cell for a
+    lone robot that may stop anywhere.
+
+    The BFS runs backward from the target: the predecessors of a cell are all
+    the cells a robot can slide into it from without crossing a wall. A robot
+    may need a blocker to actually stop there, so this is a lower bound on the
+    real number of moves (admissible and consistent). Cells that can't reach
+    the target at all are left at UNREACHABLE.
+
+    Returns:
+        array: Distance per flat cell index.
+    """
+    neighbors = compiled_board.neighbors
+    distances = array("B", [UNREACHABLE]) * compiled_board.num_cells
+    distances[target_cell] = 0
+    queue = deque([target_cell])
+
+    while queue:
+        cell = queue.popleft()
+        dist = distances[cell] + 1
+
+        # Every cell on the open ray from this cell can slide back into it
+        for direction in range(4):
+            previous = neighbors[cell * 4 + direction]
+            while previous >= 0:
+                if distances[previous] == UNREACHABLE:
+                    distances[previous] = dist
+                    queue.append(previous)
+                previous = neighbors[previous * 4 + direction]
+
+    return distances
+
+
+def all_target_distances(compiled_board):
+    """
+    Compute the distance tables of every target cell of a board in one batch.
+
+    The rays a robot can slide along are collected once per board, so each
+    target's BFS only walks precomputed adjacency lists.
+
+    Returns:
+        list: One distance array (see target_distances) per target cell.
+    """
+    num_cells = compiled_board.num_cells
+    neighbors = compiled_board.neighbors
+    open_lines = []
+    for cell in range(num_cells):
+        line = []
+        for direction in range(4):
+            previous = neighbors[cell * 4 + direction]
+            while previous >= 0:
+                line.append(previous)
+                previous = neighbors[previous * 4 + direction]
+        open_lines.append(line)
+
+    tables = []
+    empty = array("B", [UNREACHABLE]) * num_cells
+    for target_cell in range(num_cells):
+        distances = array("B", empty)
+        distances[target_cell] = 0
+        queue = deque([target_cell])
+        while queue:
+            cell = queue.popleft()
+            dist = distances[cell] + 1
+            for previous in open_lines[cell]:
+                if distances[previous] == UNREACHABLE:
+                    distances[previous] = dist
+                    queue.append(previous)
+        tables.append(distances)
+    return tables
+
+
+class DistanceTableCache:
+    def __init__(self, max_boards=32):
+        """
+        LRU cache of the all-targets distance tables of recently used boards,
+        keyed by the hash of their wall layout.
+
+        Args:
+            max_boards (int): Number of boards to keep before evicting the least recently used.
+        """
+        self.max_boards = max_boards
+        self.tables = OrderedDict()
+
+    def __len__(self):
+        return len(self.tables)
+
+    def get(self, compiled_board):
+        """Return the distance tables of every target cell of a board."""
+        key = compiled_board.layout_key
+        tables = self.tables.get(key)
+        if tables is None:
+            tables = all_target_distances(compiled_board)
+            self.tables[key] = tables
+            if len(self.tables) > self.max_boards:
+                self.tables.popitem(last=False)
+        else:
+            self.tables.move_to_end(key)
+        return tables
+
+    def clear(self):
+        self.tables.clear()
+
+
+# Cache shared by all solvers of this process
+distance_cache = DistanceTableCache()
@@ -0,0 +1,207 @@
+import random
+
+from board import compile_board
+
+# Game constants
+GRID_SIZE = 16
+ROBOT_COLORS = ("red", "green", "blue", "yellow")
+WALL_COUNT = 40
+
+
+def is_center(pos, size=GRID_SIZE):
+    """Check if a position is inside the central 2x2 square, where robots and targets never go."""
+    low, high = size // 2 - 1, size // 2
+    return low <= pos[0] <= high and low <= pos[1] <= high
+
+
+def create_board(rng, size=GRID_SIZE, wall_count=WALL_COUNT):
+    """
+    Generate a board with outer walls, the central square and random internal walls.
+
+    Args:
+        rng (random.Random): Random generator, seed it for reproducible boards.
+        size (int): Number of rows and columns.
+        wall_count (int): Number of random internal walls.
+
+    Returns:
+        list: 2D list of cells, each a dict with a "walls" set of directions.
+    """
+    board = [[{"walls": set()} for _ in range(size)] for _ in range(size)]
+    # Outer walls
+    for i in range(size):
+        board[0][i]["walls"].add("N")
+        board[size - 1][i]["walls"].add("S")
+        board[i][0]["walls"].add("W")
+        board[i][size - 1]["walls"].add("E")
+    # Central square walls
+    low, high = size // 2 - 1, size // 2
+    for i in range(low, high + 1):
+        for j in range(low, high + 1):
+            if i == low:
+                board[i][j]["walls"].add("N")
+            if i == high:
+                board[i][j]["walls"].add("S")
+            if j == low:
+                board[i][j]["walls"].add("W")
+            if j == high:
+                board[i][j]["walls"].add("E")
+    # Random internal walls
+    count = 0
+    while count < wall_count:
+        x = rng.randint(0, size - 2)
+        y = rng.randint(0, size - 2)
+        if rng.choice([True, False]):
+            if "S" not in board[x][y]["walls"] and "N" not in board[x][y + 1]["walls"]:
+                board[x][y]["walls"].add("S")
+                board[x][y + 1]["walls"].add("N")
+                count += 1
+        else:
+            if "E" not in board[x][y]["walls"] and "W" not in board[x + 1][y]["walls"]:
+                board[x][y]["walls"].add("E")
+                board[x + 1][y]["walls"].add("W")
+                count += 1
+    return board
+
+
+def place_robots_randomly(rng, colors=ROBOT_COLORS, size=GRID_SIZE):
+    """
+    Put every robot on a distinct random cell outside the central square.
+
+    Returns:
+        dict: Mapping from robot color to position tuple (row, col).
+    """
+    positions = {}
+    for color in colors:
+        while True:
+            pos = (rng.randint(0, size - 1), rng.randint(0, size - 1))
+            if pos not in positions.values() and not is_center(pos, size):
+                positions[color] = pos
+                break
+    return positions
+
+
+def random_target(rng, robot_positions, size=GRID_SIZE):
+    """
+    Pick a random target robot and a free target cell outside the central square.
+
+    Returns:
+        (str, tuple): The target color and the target position (row, col).
+    """
+    color = rng.choice(list(robot_positions.keys()))
+    occupied = set(robot_positions.values())
+    while True:
+        pos = (rng.randint(0, size - 1), rng.randint(0, size - 1))
+        if pos not in occupied and not is_center(pos, size):
+            return color, pos
+
+
+def move_robot(compiled_board, positions, color, direction):
+    """
+    Apply the ricochet rule: the robot slides until it hits a wall or another robot.
+
+    Args:
+        compiled_board (CompiledBoard): The board the robots are on.
+        positions (dict): Mapping from robot color to position tuple (row, col).
+        color (str): The color of the robot to move.
+        direction (str): Direction to move: 'N', 'S', 'E', or 'W'.
+
+    Returns:
+        tuple: The new position (row, col) of the robot, unchanged if it can't move.
+    """
+    others = [pos for other_color, pos in positions.items() if other_color != color]
+    return compiled_board.move_position(positions[color], direction, others)
+
+
+def board_to_walls(board):
+    """Serialize a board as rows of wall strings, e.g. "NW" for a cell with north and west walls."""
+    return [["".join(d for d in "NSEW" if d in cell["walls"]) for cell in row] for row in board]
+
+
+def board_from_walls(walls):
+    """Build a board from the rows of wall strings produced by board_to_walls."""
+    return [[{"walls": set(cell)} for cell in row] for row in walls]
+
+
+class Puzzle:
+    def __init__(self, board, robots, target_color, target_pos):
+        """
+        Args:
+            board (list): 2D list representing the game board cells. Each cell is a dict with "walls".
+            robots (dict): Mapping from robot color to position tuple (row, col).
+            target_color (str): The color of the robot that must reach the target.
+            target_pos (tuple): The target cell position (row, col).
+        """
+        self.board = board
+        self.robots = robots
+        self.target_color = target_color
+        self.target_pos = target_pos
+
+    def is_solved_by(self, moves):
+        """Check if a list of (color, direction) moves brings the target robot to the target."""
+        compiled_board = compile_board(self.board)
+        positions = dict(self.robots)
+        for color, direction in moves:
+            positions[color] = move_robot(compiled_board, positions, color, direction)
+        return positions[self.target_color] == self.target_pos
+
+    def to_dict(self):
+        """Return a JSON-serializable dict, see from_dict."""
+        return {
+            "walls": board_to_walls(self.board),
+            "robots": {color: list(pos) for color, pos in self.robots.items()},
+            "target_color": self.target_color,
+            "target": list(self.target_pos),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Build a puzzle from a dict such as a decoded JSON line.
+
+        Args:
+            data (dict): "walls" (rows of wall strings, see board_to_walls),
+                         "robots" ({color: [row, col]}), "target_color" and "target" ([row, col]).
+        """
+        return cls(
+            board_from_walls(data["walls"]),
+            {color: tuple(pos) for color, pos in data["robots"].items()},
+            data["target_color"],
+            tuple(data["target"]),
+        )
+
+
+class PuzzleGenerator:
+    def __init__(self, seed=None, size=GRID_SIZE, colors=ROBOT_COLORS, wall_count=WALL_COUNT):
+        """
+        Reproducible source of boards and puzzles: the same seed always yields
+        the same sequence.
+
+        Args:
+            seed (int): Seed of the random generator, None for a random one.
+            size (int): Number of rows and columns of the boards.
+            colors (tuple): Robot colors.
+            wall_count (int): Number of random internal walls per board.
+        """
+        self.rng = random.Random(seed)
+        self.size = size
+        self.colors = colors
+        self.wall_count = wall_count
+
+    def new_board(self):
+        return create_board(self.rng, self.size, self.wall_count)
+
+    def new_puzzle(self, board=None):
+        """Generate a puzzle, on a new board unless one is given."""
+        if board is None:
+            board = self.new_board()
+        robots = place_robots_randomly(self.rng, self.colors, self.size)
+        target_color, target_pos = random_target(self.rng, robots, self.size)
+        return Puzzle(board, robots, target_color, target_pos)
+
+    def puzzles(self, count, puzzles_per_board=1):
+        """Yield count puzzles, drawing a new board every puzzles_per_board puzzles."""
+        board = None
+        for index in range(count):
+            if index % puzzles_per_board == 0:
+                board = self.new_board()
+            yield self.new_puzzle(board)
@@ -0,0 +1,358 @@
+import multiprocessing
+import os
+import queue
+import time
+from array import array
+
+from distance_tables import UNREACHABLE
+from node_store import NodeStore
+from open_list import make_open_list
+from reachability_a_star import ReachabilityAStarSolver
+from solver_base import DEAD, EXPANDED, NO_MOVE, UNPRUNED
+
+# Cost of the best solution before one is found
+INFINITE = 1 << 30
+# Nodes sent to another worker in one message
+BATCH_SIZE = 128
+# Expansions between two flushes of the outgoing batches and two reads of the inbox
+SYNC_INTERVAL = 64
+# Values of the shared done flag
+RUNNING = 0
+FINISHED = 1
+CANCELLED = 2
+
+
+class HDAStarSolver(ReachabilityAStarSolver):
+    def __init__(self, board, initial_positions, target_color, target_pos, max_depth=30,
+                 heuristic="reachability", workers=None):
+        """
+        Hash-distributed A* (HDA*): one puzzle searched by several worker processes.
+
+        Every state is owned by one worker, chosen by a hash of the state. A
+        worker only expands the states it owns; the children it generates are
+        sent, in batches, to the queues of their owners, which do the duplicate
+        detection exactly like the serial search (see BaseAStarSolver.a_star_search).
+
+        Args:
+            board (list): 2D list representing the game board cells. Each cell is a dict with "walls".
+            initial_positions (dict): Mapping from robot color to position tuple (row, col).
+            target_color (str): The color of the robot that must reach the target.
+            target_pos (tuple): The target cell position (row, col).
+            max_depth (int): Maximum number of moves (depth) to search.
+            heuristic (str): 'reachability' or 'robot_aware' (see ReachabilityAStarSolver).
+            workers (int): Number of worker processes, None for one per CPU.
+        """
+        super().__init__(board, initial_positions, target_color, target_pos, max_depth, heuristic)
+        self.workers = workers or os.cpu_count() or 1
+
+    def solve(self, progress_callback=None):
+        """Find an optimal solution, see hda_star_search."""
+        return self.hda_star_search(progress_callback)
+
+    def hda_star_search(self, progress_callback=None, prune_moves=True):
+        """
+        Run HDA* and wait for the optimality proof.
+
+        A worker that pops a goal node offers its cost as the incumbent solution.
+        Workers go idle once their inbox is empty and none of their open nodes
+        has an f below the incumbent. Every message is counted as outstanding
+        until its receiver has handled it, so when all workers are idle and no
+        message is outstanding no node can beat the incumbent anymore, and the
+        search stops. The path is then traced back across the workers that own
+        its nodes.
+
+        Args:
+            progress_callback (callable): Optional callback function to report progress
+                                        and check for cancellation
+            prune_moves (bool): Skip successors that can't lead to a shorter solution
+                                (see BaseSolver._successors).
+
+        Returns:
+            list: A list of (color, direction) moves, or None if no solution is found.
+        """
+        context = multiprocessing.get_context()
+        workers = self.workers
+        inboxes = [context.Queue() for _ in range(workers)]
+        results = context.Queue()
+        shared = {
+            "lock": context.Lock(),
+            "outstanding": context.Value("q", 0, lock=False),
+            "idle": context.Array("b", workers, lock=False),
+            "incumbent": context.Value("i", INFINITE, lock=False),
+            "incumbent_node": context.Value("q", -1, lock=False),
+            "done": context.Value("b", RUNNING, lock=False),
+            "explored": context.Array("q", workers, lock=False),
+        }
+        solver_args = (self.board, self.initial_positions, self.target_color, self.target_pos,
+                       self.max_depth, self.heuristic, workers)
+        processes = [
+            context.Process(target=_run_worker,
+                            args=(solver_args, worker_id, prune_moves, inboxes, results, shared),
+                            daemon=True)
+            for worker_id in range(workers)
+        ]
+        for process in processes:
+            process.start()
+
+        done = shared["done"]
+        last_report_time = time.time()
+        try:
+            while done.value == RUNNING:
+                time.sleep(0.01)
+                # Report progress every 0.5 seconds
+                current_time = time.time()
+                if progress_callback and current_time - last_report_time > 0.5:
+                    last_report_time = current_time
+                    if not progress_callback(sum(shared["explored"])):
+                        done.value = CANCELLED
+                        break
+                if not all(process.is_alive() for process in processes):
+                    raise RuntimeError("An HDA* worker exited unexpectedly")
+
+            moves = None
+            if done.value == FINISHED and shared["incumbent"].value < INFINITE:
+                moves = self._trace(shared["incumbent_node"].value, inboxes, results)
+
+            for inbox in inboxes:
+                inbox.put(("stop",))
+            worker_stats = [None] * workers
+            for _ in range(workers):
+                _, worker_id, stats = results.get()
+                worker_stats[worker_id] = stats
+        finally:
+            for process in processes:
+                process.join(timeout=1)
+                if process.is_alive():
+                    process.terminate()
+
+        self._record_worker_stats(worker_stats)
+        if progress_callback:
+            progress_callback(self.stats["states_explored"])
+        if moves is None:
+            return None
+        return self._to_moves(moves)
+
+    def _trace(self, node_id, inboxes, results):
+        """Follow the parent links of a node across the workers to rebuild its move codes."""
+        workers = self.workers
+        moves = []
+        while True:
+            inboxes[node_id % workers].put(("trace", node_id // workers))
+            _, node_id, move = results.get()
+            # The root has no parent and wasn't reached by a move
+            if node_id < 0:
+                break
+            moves.append(move)
+        moves.reverse()
+        return moves
+
+    def _record_worker_stats(self, worker_stats):
+        """Store the counters of the workers in self.stats, in total and per worker."""
+        expansions = sum(stats["expansions"] for stats in worker_stats)
+        generated = sum(stats["generated"] for stats in worker_stats)
+        self.pruned_moves = sum(stats["pruned_moves"] for stats in worker_stats)
+        self._record_stats(expansions, generated, sum(stats["states_explored"] for stats in worker_stats))
+        self.stats["workers"] = self.workers
+        self.stats["worker_expansions"] = [stats["expansions"] for stats in worker_stats]
+        self.stats["nodes_sent"] = sum(stats["nodes_sent"] for stats in worker_stats)
+
+    # Worker side
+
+    def _owner(self, state):
+        """Index of the worker owning a state."""
+        return (((state * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) >> 32) % self.workers
+
+    def _work(self, worker_id, prune_moves, inboxes, results, shared):
+        """Main loop of a worker process."""
+        self.worker_id = worker_id
+        self.inboxes = inboxes
+        self.shared = shared
+        self.prune_moves = prune_moves
+        self.open_set = make_open_list("bucket")
+        self.visited = {}
+        self.nodes = NodeStore(self.codec.state_bits)
+        self.node_flags = bytearray()
+        # Same type as NodeStore.g_costs, f can go past 255 with a large max_depth
+        self.f_costs = array("H")
+        self.outboxes = [[] for _ in range(self.workers)]
+        self.expansions = 0
+        self.generated = 0
+        self.nodes_sent = 0
+        self.pruned_moves = 0
+
+        start_state = self.codec.canonical(self.codec.pack(self.initial_positions))
+        if self._owner(start_state) == worker_id:
+            self._receive(start_state, 0, -1, NO_MOVE)
+
+        inbox = inboxes[worker_id]
+        done = shared["done"]
+        lock = shared["lock"]
+        idle = shared["idle"]
+        while done.value == RUNNING:
+            if self._expand_next():
+                if self.expansions % SYNC_INTERVAL == 0:
+                    shared["explored"][worker_id] = len(self.visited)
+                    self._flush_all()
+                    self._drain(inbox, block=False)
+                continue
+            # Nothing left worth expanding: hand over what was generated and wait for nodes
+            self._flush_all()
+            shared["explored"][worker_id] = len(self.visited)
+            if self._drain(inbox, block=False):
+                continue
+            with lock:
+                idle[worker_id] = 1
+                if shared["outstanding"].value == 0 and all(idle):
+                    done.value = FINISHED
+            self._drain(inbox, block=True)
+
+        # Answer path traces until told to stop
+        while True:
+            message = inbox.get()
+            if message[0] == "trace":
+                node = message[1]
+                results.put(("trace", self.nodes.parents[node], self.nodes.moves[node]))
+            elif message[0] == "stop":
+                break
+        results.put(("stats", worker_id, {
+            "expansions": self.expansions,
+            "generated": self.generated,
+            "states_explored": len(self.visited),
+            "pruned_moves": self.pruned_moves,
+            "nodes_sent": self.nodes_sent,
+        }))
+
+    def _drain(self, inbox, block):
+        """
+        Handle the batches waiting in the inbox, waiting a little for one if block is set.
+
+        Returns:
+            bool: Whether any batch was handled.
+        """
+        shared = self.shared
+        handled = False
+        while True:
+            try:
+                message = inbox.get(timeout=0.01) if block and not handled else inbox.get_nowait()
+            except queue.Empty:
+                return handled
+            if message[0] != "nodes":
+                # A trace or stop request can only come once the search is over
+                inbox.put(message)
+                return handled
+            handled = True
+            shared["idle"][self.worker_id] = 0
+            for state, g_cost, parent, move in message[1]:
+                self._receive(state, g_cost, parent, move)
+            with shared["lock"]:
+                shared["outstanding"].value -= 1
+
+    def _expand_next(self):
+        """
+        Pop and expand the best open node, unless its f can't beat the incumbent.
+
+        Returns:
+            bool: Whether a node was popped.
+        """
+        open_set = self.open_set
+        nodes = self.nodes
+        incumbent = self.shared["incumbent"].value
+        while open_set:
+            node = open_set.pop()
+            state = nodes.states[node]
+            # Skip stale entries: the state got a better node after this one was pushed
+            if self.visited[state] != node:
+                continue
+            g_cost = nodes.g_costs[node]
+            if self.f_costs[node] >= incumbent:
+                open_set.push(self.f_costs[node], g_cost, node)
+                return False
+            if self._is_goal(state):
+                self._offer_solution(g_cost, node)
+                return True
+            if g_cost >= self.max_depth:
+                return True
+            self._expand(node, state, g_cost)
+            return True
+        return False
+
+    def _offer_solution(self, cost, node):
+        """Make a goal node the incumbent solution if it is the cheapest so far."""
+        shared = self.shared
+        with shared["lock"]:
+            if cost < shared["incumbent"].value:
+                shared["incumbent"].value = cost
+                shared["incumbent_node"].value = node * self.workers + self.worker_id
+
+    def _expand(self, node, state, g_cost):
+        self.expansions += 1
+        self.node_flags[node] |= EXPANDED
+        if self.prune_moves and not self.node_flags[node] & UNPRUNED:
+            last_move = self.nodes.moves[node]
+        else:
+            last_move = NO_MOVE
+        parent = node * self.workers + self.worker_id
+        new_g_cost = g_cost + 1
+        for move, new_state in self._successors(state, last_move):
+            self.generated += 1
+            owner = self._owner(new_state)
+            if owner == self.worker_id:
+                self._receive(new_state, new_g_cost, parent, move)
+            else:
+                outbox = self.outboxes[owner]
+                outbox.append((new_state, new_g_cost, parent, move))
+                if len(outbox) >= BATCH_SIZE:
+                    self._flush(owner)
+
+    def _receive(self, state, g_cost, parent, move):
+        """Add a node for an owned state, with the duplicate rules of the serial search."""
+        visited = self.visited
+        nodes = self.nodes
+        flags = 0
+        other = visited.get(state)
+        if other is not None:
+            if other == DEAD:
+                return
+            other_g_cost = nodes.g_costs[other]
+            if other_g_cost < g_cost:
+                return
+            if other_g_cost == g_cost:
+                if not self.prune_moves or self.node_flags[other] & UNPRUNED:
+                    return
+                if not self.node_flags[other] & EXPANDED:
+                    self.node_flags[other] |= UNPRUNED
+                    return
+                flags = UNPRUNED
+        h_cost = self._heuristic(state)
+        if h_cost == UNREACHABLE:
+            visited[state] = DEAD
+            return
+        if g_cost + h_cost > self.max_depth:
+            return
+        node = nodes.add(state, parent, move, g_cost)
+        self.node_flags.append(flags)
+        self.f_costs.append(g_cost + h_cost)
+        visited[state] = node
+        self.open_set.push(g_cost + h_cost, g_cost, node)
+
+    def _flush(self, owner):
+        """Send the nodes waiting for a worker as one message."""
+        outbox = self.outboxes[owner]
+        shared = self.shared
+        # Count the message before it is sent, so it is never in flight uncounted
+        with shared["lock"]:
+            shared["outstanding"].value += 1
+        self.inboxes[owner].put(("nodes", outbox))
+        self.nodes_sent += len(outbox)
+        self.outboxes[owner] = []
+
+    def _flush_all(self):
+        for owner, outbox in enumerate(self.outboxes):
+            if outbox:
+                self._flush(owner)
+
+
+def _run_worker(solver_args, worker_id, prune_moves, inboxes, results, shared):
+    """Entry point of an HDA* worker process."""
+    solver = HDAStarSolver(*solver_args)
+    solver._work(worker_id, prune_moves, inboxes, results, shared)
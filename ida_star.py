@@ -0,0 +1,165 @@
+from array import array
+
+from distance_tables import UNREACHABLE
+from reachability_a_star import ReachabilityAStarSolver
+from solver_base import NO_MOVE
+
+# Result of _search when the goal was reached
+FOUND = -1
+# Bound returned by subtrees without any node left to explore
+INFINITE = 1 << 30
+
+
+class SearchCancelled(Exception):
+    """Raised inside the depth-first search when the progress callback cancels it."""
+
+
+class IDAStarSolver(ReachabilityAStarSolver):
+    def __init__(self, board, initial_positions, target_color, target_pos, max_depth=30,
+                 heuristic="reachability", table_bits=20):
+        """
+        Iterative-deepening A* using the reachability heuristics, with memory that
+        doesn't grow with the search.
+
+        Args:
+            board (list): 2D list representing the game board cells. Each cell is a dict with "walls".
+            initial_positions (dict): Mapping from robot color to position tuple (row, col).
+            target_color (str): The color of the robot that must reach the target.
+            target_pos (tuple): The target cell position (row, col).
+            max_depth (int): Maximum number of moves (depth) to search.
+            heuristic (str): 'reachability' or 'robot_aware' (see ReachabilityAStarSolver).
+                             The robot-aware memo is bounded (see MAX_EXACT_PATH_TABLES).
+            table_bits (int): The transposition table has 2 ** table_bits entries (about 13 bytes each).
+        """
+        super().__init__(board, initial_positions, target_color, target_pos, max_depth, heuristic)
+        self.table_bits = table_bits
+        self.table_size = 1 << table_bits
+
+    def solve(self, progress_callback=None):
+        """Find an optimal solution, see ida_star_search."""
+        return self.ida_star_search(progress_callback)
+
+    def ida_star_search(self, progress_callback=None, prune_moves=True):
+        """
+        Run depth-first searches bounded by f = g + h, raising the bound to the
+        smallest f that exceeded it until the goal is found.
+
+        A fixed-size transposition table, where a new entry replaces whatever was
+        in its slot, remembers the depth at which each state was last searched
+        (so duplicates inside one iteration are skipped) and the best lower bound
+        learned for it (so later iterations prune earlier).
+
+        Move pruning depends on the move that led to a state, so with it enabled
+        an entry only stands for the state reached through the same last move
+        when the depths are equal.
+
+        Args:
+            progress_callback (callable): Optional callback function to report progress
+                                        and check for cancellation
+            prune_moves (bool): Skip successors that can't lead to a shorter solution
+                                (see BaseSolver._successors).
+
+        Returns:
+            list: A list of (color, direction) moves, or None if no solution is found.
+        """
+        size = self.table_size
+        self.table_states = array("Q", [0]) * size
+        self.table_depths = array("B", [0]) * size
+        self.table_bounds = array("B", [0]) * size
+        self.table_iterations = array("B", [0]) * size
+        self.table_moves = array("H", [NO_MOVE]) * size
+        self.progress_callback = progress_callback
+        self.prune_moves = prune_moves
+        self.pruned_moves = 0
+        self.expansions = 0
+        self.generated = 0
+        self.iteration = 0
+
+        start_state = self.codec.canonical(self.codec.pack(self.initial_positions))
+        bound = self._heuristic(start_state)
+        path = []
+        try:
+            while bound <= self.max_depth:
+                self.iteration += 1
+                result = self._search(start_state, 0, bound, path, NO_MOVE)
+                if result == FOUND:
+                    self._finish()
+                    return self._to_moves(path)
+                bound = result
+        except SearchCancelled:
+            self._finish(report=False)
+            return None
+
+        self._finish()
+        return None
+
+    def _search(self, state, g_cost, bound, path, last_move):
+        """
+        Depth-first search below a state.
+
+        Returns:
+            int: FOUND, or the smallest f above the bound seen in the subtree.
+        """
+        if self._is_goal(state):
+            return FOUND
+
+        slot = ((state * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) >> (64 - self.table_bits)
+        h_cost = self._heuristic(state)
+        known = self.table_states[slot] == state
+        same_move = known and self.table_moves[slot] == last_move
+        if known and self.table_iterations[slot] == self.iteration & 0xFF:
+            # Already searched during this iteration without reaching the goal, so nothing
+            # below it fits in the bound: from a shallower depth, or from the same depth
+            # with the same moves allowed
+            depth = self.table_depths[slot]
+            if depth < g_cost or (depth == g_cost and same_move):
+                return bound + 1
+        if same_move:
+            h_cost = max(h_cost, self.table_bounds[slot])
+        f_cost = g_cost + h_cost
+        if f_cost > bound:
+            return f_cost
+
+        self.expansions += 1
+        if self.progress_callback and self.expansions % 1000 == 0:
+            if not self.progress_callback(self.expansions):
+                raise SearchCancelled()
+
+        if not same_move:
+            self.table_states[slot] = state
+            self.table_moves[slot] = last_move
+            self.table_bounds[slot] = h_cost
+        self.table_depths[slot] = g_cost
+        self.table_iterations[slot] = self.iteration & 0xFF
+
+        minimum = INFINITE
+        for move, new_state in self._successors(state, last_move):
+            self.generated += 1
+            path.append(move)
+            result = self._search(new_state, g_cost + 1, bound, path, move if self.prune_moves else NO_MOVE)
+            if result == FOUND:
+                return FOUND
+            path.pop()
+            if result < minimum:
+                minimum = result
+
+        # Learn a better lower bound for the next iterations, unless the slot was taken meanwhile
+        if self.table_states[slot] == state and self.table_moves[slot] == last_move and minimum < INFINITE:
+            self.table_bounds[slot] = min(max(h_cost, minimum - g_cost), UNREACHABLE)
+        return minimum
+
+    def _finish(self, report=True):
+        """Record the counters of the search and report them one last time."""
+        self.stats = {
+            "expansions": self.expansions,
+            "generated": self.generated,
+            "states_explored": self.expansions,
+            "iterations": self.iteration,
+            "pruned_moves": self.pruned_moves,
+            "branching_factor": self.generated / self.expansions if self.expansions else 0.0,
+            "unpruned_branching_factor": (
+                (self.generated + self.pruned_moves) / self.expansions if self.expansions else 0.0
+            ),
+        }
+        if report and self.progress_callback:
+            self.progress_callback(self.expansions)
@@ -0,0 +1,58 @@
+from array import array
+
+
+class NodeStore:
+    def __init__(self, state_bits=64):
+        """
+        Keep search nodes in parallel arrays instead of one object per node.
+
+        A node is an index into the arrays. It records its packed state, the
+        index of its parent node, the code of the move that led to it
+        and its g-cost. Move lists are only rebuilt when a path is requested.
+
+        Args:
+            state_bits (int): Number of bits needed by a packed state. States that fit
+                              into 64 bits are stored unboxed in an array.
+        """
+        self.states = array("Q") if state_bits <= 64 else []
+        self.parents = array("l")
+        self.moves = array("H")
+        self.g_costs = array("H")
+
+    def __len__(self):
+        return len(self.parents)
+
+    def nbytes(self):
+        """Approximate memory used by the node arrays, in bytes."""
+        arrays = (self.parents, self.moves, self.g_costs)
+        total = sum(values.itemsize * len(values) for values in arrays)
+        if isinstance(self.states, array):
+            return total + self.states.itemsize * len(self.states)
+        # Boxed states: a list slot plus a large int each
+        return total + len(self.states) * 48
+
+    def add(self, state, parent, move, g_cost):
+        """
+        Append a node and return its index.
+
+        Args:
+            state (int): Packed state of the node.
+            parent (int): Index of the parent node, -1 for the root.
+            move (int): Move code that led from the parent to this node.
+            g_cost (int): Number of moves from the root.
+        """
+        self.states.append(state)
+        self.parents.append(parent)
+        self.moves.append(move)
+        self.g_costs.append(g_cost)
+        return len(self.parents) - 1
+
+    def path(self, node):
+        """Return the move codes leading from the root to a node."""
+        moves = []
+        parents = self.parents
+        while parents[node] >= 0:
+            moves.append(self.moves[node])
+            node = parents[node]
+        moves.reverse()
+        return moves
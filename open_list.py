@@ -0,0 +1,83 @@
+import heapq
+
+
+class HeapOpenList:
+    def __init__(self):
+        """
+        Binary heap open list. Entries with equal f are popped first in, first out.
+        """
+        self.heap = []
+        self.counter = 0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def push(self, f_cost, g_cost, node):
+        heapq.heappush(self.heap, (f_cost, self.counter, node))
+        self.counter += 1
+
+    def pop(self):
+        return heapq.heappop(self.heap)[2]
+
+
+class BucketOpenList:
+    def __init__(self):
+        """
+        Bucket open list for small integer costs, with O(1) push and amortized O(1) pop.
+
+        Nodes are kept in buckets[f][g] stacks. The lowest f is popped first,
+        ties go to the highest g (the node deepest in the search, so closest to
+        the goal), and the last node pushed into a bucket is popped first.
+        """
+        self.buckets = []
+        self.min_f = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def push(self, f_cost, g_cost, node):
+        buckets = self.buckets
+        while len(buckets) <= f_cost:
+            buckets.append([])
+        by_g = buckets[f_cost]
+        while len(by_g) <= g_cost:
+            by_g.append([])
+        by_g[g_cost].append(node)
+        self.size += 1
+        if f_cost < self.min_f:
+            self.min_f = f_cost
+
+    def pop(self):
+        if not self.size:
+            raise IndexError("pop from an empty open list")
+        f_cost = self.min_f
+        while True:
+            by_g = self.buckets[f_cost]
+            # Drop exhausted g stacks from the top so the last one is always the highest non-empty g
+            while by_g and not by_g[-1]:
+                by_g.pop()
+            if by_g:
+                break
+            f_cost += 1
+        self.min_f = f_cost
+        self.size -= 1
+        return by_g[-1].pop()
+
+
+OPEN_LISTS = {
+    "bucket": BucketOpenList,
+    "heap": HeapOpenList,
+}
+
+
+def make_open_list(open_list):
+    """
+    Create an open list from its name ('bucket' or 'heap') or from a class
+    providing push(f_cost, g_cost, node), pop() and len().
+    """
+    if isinstance(open_list, str):
+        if open_list not in OPEN_LISTS:
+            raise ValueError(f"Unknown open list: {open_list!r}")
+        open_list = OPEN_LISTS[open_list]
+    return open_list()
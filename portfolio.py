@@ -0,0 +1,242 @@
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import time
+
+from distance_tables import distance_cache
+from game_core import Puzzle
+from solver_base import BaseSolver
+from solvers import SOLVERS, is_admissible, make_solver
+
+# Solver types raced by default; only admissible ones can prove a solution optimal
+DEFAULT_ENGINES = ("reachability", "robot_aware", "ida_star")
+DEFAULT_STATS_PATH = os.path.join(os.path.expanduser("~"), ".ricochet_robots", "portfolio_wins.json")
+# Seconds the losing engines get to stop on their own before they are terminated
+STOP_GRACE = 1.0
+
+
+class PortfolioSolver(BaseSolver):
+    def __init__(self, board, initial_positions, target_color, target_pos, max_depth=30,
+                 engines=DEFAULT_ENGINES, win_stats=None, max_engines=None):
+        """
+        Race several solvers on the same puzzle, one process each, and keep the first optimal answer.
+
+        Args:
+            board (list): 2D list representing the game board cells. Each cell is a dict with "walls".
+            initial_positions (dict): Mapping from robot color to position tuple (row, col).
+            target_color (str): The color of the robot that must reach the target.
+            target_pos (tuple): The target cell position (row, col).
+            max_depth (int): Maximum number of moves (depth) to search.
+            engines (tuple): Solver types to race (keys of SOLVERS).
+            win_stats (WinStats): Where the winners are recorded, None to not record them.
+            max_engines (int): Engines raced at once, None for one per CPU. When there are
+                               more engines, the ones that won most often on this kind of
+                               puzzle are raced (see WinStats.rank), keeping one admissible.
+        """
+        super().__init__(board, initial_positions, target_color, target_pos, max_depth)
+        for engine in engines:
+            if engine not in SOLVERS:
+                raise ValueError(f"Unknown solver: {engine!r}")
+        self.engines = tuple(engines)
+        self.win_stats = win_stats
+        self.max_engines = max_engines or os.cpu_count() or 1
+
+    def finds_optimal(self):
+        """The answer is optimal when an admissible engine wins, so any of them will do."""
+        return any(is_admissible(engine) for engine in self.engines)
+
+    def solve(self, progress_callback=None):
+        """
+        Start the engines (see select_engines) and wait for the first one that proves its answer.
+
+        An answer from an admissible engine, solution or proof that there is
+        none within max_depth, ends the race: the other engines are told to
+        stop and terminated if they haven't after STOP_GRACE seconds. Answers
+        of other engines are only kept in case no admissible engine finishes.
+        The winner is stored in self.stats["winner"] and recorded in the win
+        statistics, and self.stats["optimal"] tells whether it is admissible:
+        the answer of another engine, kept after the admissible ones failed or
+        were cancelled, may not be optimal.
+
+        Engines run in non-daemonic processes, so engines with worker
+        processes of their own (hda_star) work too.
+
+        Args:
+            progress_callback (callable): Optional callback function taking the total number
+                                          of states explored by the engines, returning
+                                          False to cancel them all.
+
+        Returns:
+            list: A list of (color, direction) moves, or None if no solution is found.
+
+        Raises:
+            RuntimeError: No engine gave an answer and some failed; the message has their errors.
+        """
+        engines = self.select_engines()
+        context = multiprocessing.get_context()
+        results = context.Queue()
+        explored = context.Array("q", len(engines), lock=False)
+        stop = context.Value("b", 0, lock=False)
+        puzzle_args = (self.board, self.initial_positions, self.target_color, self.target_pos)
+        processes = [
+            context.Process(target=_run_engine,
+                            args=(index, engine, puzzle_args, self.max_depth, results, explored, stop))
+            for index, engine in enumerate(engines)
+        ]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+
+        winner = None
+        fallback = None
+        cancelled = False
+        errors = {}
+        finished = 0
+        last_report_time = time.time()
+        try:
+            while finished < len(processes):
+                try:
+                    result = results.get(timeout=0.05)
+                except queue.Empty:
+                    # Report progress every 0.5 seconds
+                    current_time = time.time()
+                    if progress_callback and current_time - last_report_time > 0.5:
+                        last_report_time = current_time
+                        if not progress_callback(sum(explored)):
+                            cancelled = True
+                            break
+                    if not any(process.is_alive() for process in processes) and results.empty():
+                        break
+                    continue
+                finished += 1
+                if result["error"] is not None:
+                    errors[result["engine"]] = result["error"]
+                    continue
+                if is_admissible(result["engine"]):
+                    winner = result
+                    break
+                if fallback is None:
+                    fallback = result
+        finally:
+            # Ask the losers to stop, so engines with processes of their own stop them too
+            stop.value = 1
+            deadline = time.monotonic() + STOP_GRACE
+            for process in processes:
+                process.join(max(0.0, deadline - time.monotonic()))
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+            for process in processes:
+                process.join()
+
+        elapsed = time.perf_counter() - start
+        if winner is None:
+            winner = fallback
+        if winner is None and fallback is None and errors and not cancelled:
+            raise RuntimeError("Every portfolio engine failed: "
+                               + "; ".join(f"{engine}: {error}" for engine, error in errors.items()))
+        if winner is None:
+            self.stats = {"expansions": 0, "generated": 0, "states_explored": sum(explored), "winner": None,
+                          "optimal": False, "errors": errors}
+            if progress_callback:
+                progress_callback(sum(explored))
+            return None
+
+        self.stats = dict(winner["stats"])
+        self.stats["winner"] = winner["engine"]
+        self.stats["optimal"] = is_admissible(winner["engine"]) and winner["stats"].get("optimal", True)
+        self.stats["engines"] = list(engines)
+        self.stats["errors"] = errors
+        if self.win_stats is not None:
+            self.win_stats.record(self.board_kind(), winner["engine"], elapsed)
+        if progress_callback:
+            progress_callback(self.stats.get("states_explored", 0))
+        return winner["moves"]
+
+    def select_engines(self):
+        """
+        Return the engines to race: all of them if there are at most max_engines,
+        otherwise the max_engines ones with the most wins on this kind of puzzle,
+        with the best admissible engine in place of the last one if none of them is.
+        """
+        if len(self.engines) <= self.max_engines:
+            return self.engines
+        ranked = self.engines
+        if self.win_stats is not None:
+            ranked = self.win_stats.rank(self.board_kind(), self.engines)
+        selected = list(ranked[:self.max_engines])
+        if not any(is_admissible(engine) for engine in selected):
+            admissible = [engine for engine in ranked if is_admissible(engine)]
+            if admissible:
+                selected[-1] = admissible[0]
+        return tuple(selected)
+
+    def board_kind(self):
+        """
+        Key grouping similar puzzles in the win statistics: board size, number
+        of robots and the reachability distance of the target robot, a lower
+        bound of the solution length and a rough measure of how hard it is.
+        """
+        start_cell = self.compiled_board.index(self.initial_positions[self.target_color])
+        distance = distance_cache.get(self.compiled_board)[self.target_cell][start_cell]
+        return f"{self.compiled_board.rows}x{self.compiled_board.cols}/{self.codec.num_robots}/{distance}"
+
+
+def _run_engine(index, engine, puzzle_args, max_depth, results, explored, stop):
+    """Entry point of a portfolio engine process: solve and send the result, or stop when asked."""
+    # Unwind on terminate, so engines with worker processes of their own clean them up
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(1))
+
+    def progress_callback(states_explored):
+        explored[index] = states_explored
+        return not stop.value
+
+    result = {"engine": engine, "moves": None, "stats": {}, "error": None}
+    try:
+        solver = make_solver(engine, Puzzle(*puzzle_args), max_depth)
+        result["moves"] = solver.solve(progress_callback)
+        result["stats"] = solver.stats
+    except Exception as error:
+        result["error"] = repr(error)
+    results.put(result)
+
+
+class WinStats:
+    def __init__(self, path=DEFAULT_STATS_PATH):
+        """
+        Wins of the portfolio engines by kind of puzzle (see PortfolioSolver.board_kind),
+        kept in a JSON file.
+
+        Args:
+            path (str): The JSON file, created with its directory on the first record.
+        """
+        self.path = path
+        self.wins = {}
+        if os.path.exists(path):
+            with open(path) as file:
+                self.wins = json.load(file)
+
+    def record(self, kind, engine, elapsed):
+        """Count a win of an engine, with the time it took, and save the file."""
+        engine_wins = self.wins.setdefault(kind, {}).setdefault(engine, {"wins": 0, "time": 0.0})
+        engine_wins["wins"] += 1
+        engine_wins["time"] += elapsed
+        self.save()
+
+    def rank(self, kind, engines):
+        """Order engines by their wins on a kind of puzzle, most wins first, keeping the given order on ties."""
+        kind_wins = self.wins.get(kind, {})
+        return tuple(sorted(engines, key=lambda engine: -kind_wins.get(engine, {}).get("wins", 0)))
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Write a temporary file first so a crash never leaves a truncated file
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, "w") as file:
+            json.dump(self.wins, file, indent=2, sort_keys=True)
+        os.replace(temporary_path, self.path)
@@ -0,0 +1,220 @@
+import mmap
+import struct
+from collections import OrderedDict
+
+from board import board_from_wall_masks, pack_wall_masks, unpack_wall_masks, wall_masks
+from game_core import GRID_SIZE, ROBOT_COLORS, Puzzle
+
+MAGIC = b"RRPZ"
+VERSION = 1
+# magic, version, rows, cols, robots, record size, then the comma-separated robot colors
+HEADER = struct.Struct("<4sHHHHH")
+HEADER_SIZE = 64
+# Suffix of puzzle files, as recognized by batch_solve.py
+SUFFIX = ".rrp"
+# Boards decoded by a PuzzleFile, least recently used first
+MAX_DECODED_BOARDS = 32
+
+
+class PuzzleFormat:
+    def __init__(self, rows=GRID_SIZE, cols=GRID_SIZE, colors=ROBOT_COLORS):
+        """
+        Fixed-size binary records of puzzles sharing a board size and robot colors.
+
+        A record holds the wall masks of the cells packed two per byte (see
+        board.pack_wall_masks), the cell of every robot in the order of colors,
+        the index of the target color and the target cell. Cells are flat
+        indexes (row * cols + col), one byte each on boards of up to 256 cells,
+        two bytes otherwise. A 16x16 board with 4 robots takes 134 bytes.
+
+        Args:
+            rows (int): Number of rows of the boards.
+            cols (int): Number of columns of the boards.
+            colors (tuple): Robot colors.
+        """
+        self.rows = rows
+        self.cols = cols
+        self.num_cells = rows * cols
+        self.colors = tuple(colors)
+        self.color_index = {color: index for index, color in enumerate(self.colors)}
+        self.walls_size = (self.num_cells + 1) // 2
+        cell = "B" if self.num_cells <= 256 else "H"
+        # The walls are skipped, they are sliced out of the buffer instead of copied
+        self.fields = struct.Struct(f"<{self.walls_size}x{len(self.colors)}{cell}B{cell}")
+        self.record_size = self.fields.size
+        if len(self.header()) > HEADER_SIZE:
+            raise ValueError(f"Too many robot colors for the header: {colors!r}")
+
+    def header(self):
+        colors = ",".join(self.colors).encode("ascii")
+        return HEADER.pack(MAGIC, VERSION, self.rows, self.cols, len(self.colors), self.record_size) + colors
+
+    @classmethod
+    def from_header(cls, header):
+        """Return the format described by a file header, raising ValueError if it isn't one."""
+        if len(header) < HEADER_SIZE:
+            raise ValueError("Not a puzzle file: the header is truncated")
+        magic, version, rows, cols, num_robots, record_size = HEADER.unpack_from(header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a puzzle file")
+        colors = bytes(header[HEADER.size:HEADER_SIZE]).rstrip(b"\0").decode("ascii").split(",")
+        puzzle_format = cls(rows, cols, colors)
+        if len(colors) != num_robots or puzzle_format.record_size != record_size:
+            raise ValueError("Not a puzzle file: inconsistent header")
+        return puzzle_format
+
+    def pack(self, puzzle):
+        """Encode a puzzle as one record, raising ValueError if it doesn't fit the format."""
+        board = puzzle.board
+        if (len(board), len(board[0])) != (self.rows, self.cols):
+            raise ValueError(f"The board is not {self.rows}x{self.cols}")
+        if set(puzzle.robots) != set(self.colors) or puzzle.target_color not in self.color_index:
+            raise ValueError(f"The robots are not {', '.join(self.colors)}")
+        cells = [self._cell(puzzle.robots[color]) for color in self.colors]
+        fields = self.fields.pack(*cells, self.color_index[puzzle.target_color], self._cell(puzzle.target_pos))
+        return pack_wall_masks(wall_masks(board)) + fields[self.walls_size:]
+
+    def _cell(self, pos):
+        row, col = pos
+        return row * self.cols + col
+
+    def position(self, cell):
+        return divmod(cell, self.cols)
+
+
+class PuzzleWriter:
+    def __init__(self, path, rows=GRID_SIZE, cols=GRID_SIZE, colors=ROBOT_COLORS):
+        """
+        Write puzzles to a puzzle file (see PuzzleFormat), replacing any existing file.
+
+        Args:
+            path (str): The puzzle file.
+            rows (int), cols (int), colors (tuple): The format of the puzzles, see PuzzleFormat.
+        """
+        self.format = PuzzleFormat(rows, cols, colors)
+        self.file = open(path, "wb")
+        self.file.write(self.format.header().ljust(HEADER_SIZE, b"\0"))
+        self.count = 0
+
+    def write(self, puzzle):
+        self.file.write(self.format.pack(puzzle))
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_puzzles(path, puzzles, rows=GRID_SIZE, cols=GRID_SIZE, colors=ROBOT_COLORS):
+    """Write an iterable of puzzles to a puzzle file and return their number."""
+    with PuzzleWriter(path, rows, cols, colors) as writer:
+        for puzzle in puzzles:
+            writer.write(puzzle)
+    return writer.count
+
+
+class PuzzleFile:
+    def __init__(self, path):
+        """
+        Read-only, memory-mapped puzzle file written by PuzzleWriter.
+
+        Nothing is read up front: the operating system pages records in as they
+        are accessed, so files of millions of puzzles open instantly and cost
+        no memory beyond the pages in use. record() gives the raw fields of a
+        puzzle with the walls as a view into the mapping; indexing or iterating
+        gives Puzzle objects with the nested board lists the solvers take.
+        Boards are decoded once per wall layout and shared by the puzzles
+        using it (see MAX_DECODED_BOARDS), so they must not be modified.
+
+        Args:
+            path (str): The puzzle file.
+        """
+        self.path = path
+        with open(path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.data)
+        try:
+            self.format = PuzzleFormat.from_header(self.view[:HEADER_SIZE])
+        except ValueError as error:
+            self.close()
+            raise ValueError(f"{path}: {error}") from None
+        self.count, remainder = divmod(len(self.data) - HEADER_SIZE, self.format.record_size)
+        if remainder:
+            self.close()
+            raise ValueError(f"{path}: the last record is truncated")
+        self.boards = OrderedDict()
+
+    def __len__(self):
+        return self.count
+
+    def record(self, index):
+        """
+        Return the raw fields of a puzzle.
+
+        Returns:
+            (memoryview, tuple, int, int): The packed wall masks, the cells of the robots in
+                                           the order of the colors, the index of the target
+                                           color and the target cell. The walls view
+                                           must be released before the file is closed.
+        """
+        if not 0 <= index < self.count:
+            raise IndexError("puzzle index out of range")
+        offset = HEADER_SIZE + index * self.format.record_size
+        *cells, color_index, target_cell = self.format.fields.unpack_from(self.data, offset)
+        return self.view[offset:offset + self.format.walls_size], tuple(cells), color_index, target_cell
+
+    def records(self):
+        """Yield the raw fields of every puzzle, see record()."""
+        for index in range(self.count):
+            yield self.record(index)
+
+    def board(self, packed_walls):
+        """Return the board of packed wall masks, decoding it unless it was recently decoded."""
+        key = bytes(packed_walls)
+        board = self.boards.get(key)
+        if board is None:
+            puzzle_format = self.format
+            board = board_from_wall_masks(puzzle_format.rows, puzzle_format.cols,
+                                          unpack_wall_masks(key, puzzle_format.num_cells))
+            self.boards[key] = board
+            if len(self.boards) > MAX_DECODED_BOARDS:
+                self.boards.popitem(last=False)
+        else:
+            self.boards.move_to_end(key)
+        return board
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        packed_walls, cells, color_index, target_cell = self.record(index)
+        puzzle_format = self.format
+        robots = {color: puzzle_format.position(cell) for color, cell in zip(puzzle_format.colors, cells)}
+        return Puzzle(self.board(packed_walls), robots, puzzle_format.colors[color_index],
+                      puzzle_format.position(target_cell))
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self[index]
+
+    def entries(self):
+        """
+        Yield the puzzles as batch_solve.read_puzzles does, numbered from 1 and
+        with {"id": index} as the record.
+        """
+        for index in range(self.count):
+            yield index + 1, {"id": index}, self[index], None
+
+    def close(self):
+        self.view.release()
+        self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,141 @@
+import time
+import tracemalloc
+
+from budget import estimate_memory
+
+# Phases timed when profiling: heuristic calls, successor generation (robot
+# slides and state packing) and open list pushes and pops
+PHASES = ("heuristic", "successors", "open_list")
+
+
+class SearchStats:
+    def __init__(self, profile=False, trace_memory=False):
+        """
+        Extra statistics of one search, on top of the counters the search keeps itself.
+
+        By default only cheap figures are added: rates, peaks and the
+        estimated memory. With profiling, every heuristic call, successor and
+        open list operation is timed, which shows where the time goes. The
+        peak memory can also be measured with tracemalloc. Both slow the
+        search down, tracemalloc several times over, so they are best not
+        combined.
+
+        Args:
+            profile (bool): Time the phases.
+            trace_memory (bool): Measure the peak memory with tracemalloc.
+        """
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.phase_times = dict.fromkeys(PHASES, 0.0)
+        self.start_time = None
+        self.started_tracing = False
+        self.peak_memory = None
+
+    def start(self):
+        self.start_time = time.perf_counter()
+        if self.trace_memory:
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+            else:
+                tracemalloc.start()
+                self.started_tracing = True
+
+    def stop(self):
+        """Take the final memory peak and stop tracing if start() started it."""
+        if self.trace_memory and tracemalloc.is_tracing():
+            self.peak_memory = tracemalloc.get_traced_memory()[1]
+            if self.started_tracing:
+                tracemalloc.stop()
+                self.started_tracing = False
+
+    def timed(self, phase, function):
+        """Wrap a function so the time spent in it is added to a phase."""
+        phase_times = self.phase_times
+        perf_counter = time.perf_counter
+
+        def timed_function(*args):
+            start = perf_counter()
+            result = function(*args)
+            phase_times[phase] += perf_counter() - start
+            return result
+
+        return timed_function
+
+    def timed_generator(self, phase, function):
+        """Wrap a generator function so the time spent producing each item is added to a phase."""
+        phase_times = self.phase_times
+        perf_counter = time.perf_counter
+
+        def timed_function(*args):
+            iterator = function(*args)
+            while True:
+                start = perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    phase_times[phase] += perf_counter() - start
+                    return
+                phase_times[phase] += perf_counter() - start
+                yield item
+
+        return timed_function
+
+    def timed_open_list(self, open_list):
+        return TimedOpenList(open_list, self.phase_times)
+
+    def summary(self, expansions, duplicates, stale_pops, open_peak, visited_size, nodes, heuristic_memory=0):
+        """
+        Return the statistics as a dict.
+
+        Args:
+            expansions (int): Nodes expanded.
+            duplicates (int): Children dropped because their state was already reached as cheaply.
+            stale_pops (int): Open list entries skipped because their state got a better node.
+            open_peak (int): Largest size of the open list.
+            visited_size (int): Number of states in the visited dict, which only grows.
+            nodes (NodeStore): The nodes of the search.
+            heuristic_memory (int): Bytes of the heuristic memos, see budget.estimate_memory.
+
+        Returns:
+            dict: The arguments, "elapsed" seconds, "nodes_per_second" (expansions),
+                  "memory" (estimated bytes, see budget.estimate_memory), "peak_memory"
+                  (traced bytes, None without trace_memory) and the phase times
+                  ("heuristic_time", ...), None without profile.
+        """
+        elapsed = time.perf_counter() - self.start_time
+        stats = {
+            "duplicates": duplicates,
+            "stale_pops": stale_pops,
+            "open_peak": open_peak,
+            "visited_peak": visited_size,
+            "elapsed": elapsed,
+            "nodes_per_second": expansions / elapsed if elapsed > 0 else 0.0,
+            "memory": estimate_memory(nodes, heuristic_memory),
+            "peak_memory": self.peak_memory,
+        }
+        if self.trace_memory and tracemalloc.is_tracing():
+            stats["peak_memory"] = tracemalloc.get_traced_memory()[1]
+        for phase in PHASES:
+            stats[f"{phase}_time"] = self.phase_times[phase] if self.profile else None
+        return stats
+
+
+class TimedOpenList:
+    def __init__(self, open_list, phase_times):
+        """Open list proxy adding the time of pushes and pops to phase_times["open_list"]."""
+        self.open_list = open_list
+        self.phase_times = phase_times
+
+    def __len__(self):
+        return len(self.open_list)
+
+    def push(self, f_cost, g_cost, node):
+        start = time.perf_counter()
+        self.open_list.push(f_cost, g_cost, node)
+        self.phase_times["open_list"] += time.perf_counter() - start
+
+    def pop(self):
+        start = time.perf_counter()
+        node = self.open_list.pop()
+        self.phase_times["open_list"] += time.perf_counter() - start
+        return node
@@ -0,0 +1,109 @@
+from collections import OrderedDict
+from multiprocessing import shared_memory
+
+from board import board_from_wall_masks, wall_masks
+
+# Bytes used by the number of rows and the number of columns at the start of a segment
+HEADER_SIZE = 4
+
+
+class SharedBoards:
+    def __init__(self, max_idle=32):
+        """
+        Publish board wall layouts in shared memory, so worker processes can
+        read a board by name instead of unpickling the nested board list with
+        every task.
+
+        A segment holds the number of rows and columns (2 bytes each) followed by
+        one wall mask byte per cell (see board.wall_masks). Identical layouts
+        share one segment. Segments are counted by the tasks using them, and up
+        to max_idle unused ones are kept for boards that come back.
+
+        The compiled board itself (see board.CompiledBoard) isn't shared: its
+        rays are dicts, which can't live in shared memory. Each worker compiles
+        a layout once, on the first task using it (see load_board and
+        board.compile_board).
+
+        Args:
+            max_idle (int): Number of unused segments kept before the oldest is unlinked.
+        """
+        self.max_idle = max_idle
+        self.segments = {}
+        self.users = {}
+        self.layouts = {}
+        self.idle = OrderedDict()
+
+    def acquire(self, board):
+        """Return the name of the segment holding a board, creating it if needed."""
+        rows, cols = len(board), len(board[0])
+        layout = rows.to_bytes(2, "little") + cols.to_bytes(2, "little") + wall_masks(board)
+        segment = self.segments.get(layout)
+        if segment is None:
+            segment = shared_memory.SharedMemory(create=True, size=len(layout))
+            segment.buf[:len(layout)] = layout
+            self.segments[layout] = segment
+            self.users[layout] = 0
+            self.layouts[segment.name] = layout
+        self.idle.pop(layout, None)
+        self.users[layout] += 1
+        return segment.name
+
+    def release(self, name):
+        """Mark one task using a segment as done."""
+        layout = self.layouts[name]
+        self.users[layout] -= 1
+        if self.users[layout] == 0:
+            self.idle[layout] = None
+            while len(self.idle) > self.max_idle:
+                self._unlink(self.idle.popitem(last=False)[0])
+
+    def close(self):
+        """Unlink every segment."""
+        for layout in list(self.segments):
+            self._unlink(layout)
+        self.idle.clear()
+
+    def _unlink(self, layout):
+        segment = self.segments.pop(layout)
+        del self.users[layout]
+        del self.layouts[segment.name]
+        segment.close()
+        segment.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Boards read by this process, by segment name, least recently used first
+_loaded_boards = OrderedDict()
+MAX_LOADED_BOARDS = 32
+
+
+def load_board(name):
+    """
+    Read a board published by SharedBoards, reusing the one already read from
+    the same segment.
+
+    Returns:
+        list: 2D list of cells, each a dict with a "walls" set of directions.
+    """
+    board = _loaded_boards.get(name)
+    if board is None:
+        segment = shared_memory.SharedMemory(name=name)
+        try:
+            buf = segment.buf
+            rows = int.from_bytes(buf[0:2], "little")
+            cols = int.from_bytes(buf[2:4], "little")
+            board = board_from_wall_masks(rows, cols, buf[HEADER_SIZE:HEADER_SIZE + rows * cols])
+            del buf
+        finally:
+            segment.close()
+        _loaded_boards[name] = board
+        if len(_loaded_boards) > MAX_LOADED_BOARDS:
+            _loaded_boards.popitem(last=False)
+    else:
+        _loaded_boards.move_to_end(name)
+    return board
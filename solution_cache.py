@@ -0,0 +1,249 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+
+from board import DIRECTION_INDEX, DIRECTIONS, compile_board
+from state import StateCodec
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".ricochet_robots", "solutions.sqlite")
+# Rough per-row cost of SQLite and the index on top of the key and moves bytes
+ROW_OVERHEAD = 64
+# Bytes written between two checks of the cache size
+EVICTION_CHECK_BYTES = 1 << 16
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS solutions (
+    key BLOB PRIMARY KEY,
+    length INTEGER,
+    moves BLOB,
+    max_depth INTEGER NOT NULL,
+    optimal INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS solutions_last_used ON solutions (last_used);
+"""
+
+
+class SolutionCache:
+    def __init__(self, path=DEFAULT_PATH, max_bytes=64 << 20):
+        """
+        Persistent cache of solutions in a SQLite file.
+
+        Entries are keyed by a hash of the wall layout, the canonical state of
+        the robots (target robot, then the sorted helper cells, see StateCodec)
+        and the target cell, so a puzzle hits whatever the colors of its
+        helpers. Moves are stored as move codes (from cell, direction), which
+        replay from any placement with the same canonical state.
+
+        Every state along an optimal solution has the rest of that solution as
+        an optimal solution, so those suffixes are stored too: replays and
+        positions reached while following a solution hit the cache.
+
+        Failures are stored with the max_depth they were searched to, and only
+        answer requests with the same or a lower max_depth.
+
+        The least recently used entries are evicted once the entries take more
+        than max_bytes.
+
+        Args:
+            path (str): The SQLite file, created with its directory if needed.
+            max_bytes (int): Approximate size limit of the entries.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        # The UI solves in a worker thread, so calls are serialized on a lock
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+        self.bytes_since_check = EVICTION_CHECK_BYTES
+        self.hits = 0
+        self.misses = 0
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    def get(self, board, robots, target_color, target_pos, max_depth=30, optimal=True):
+        """
+        Look a puzzle up.
+
+        Args:
+            board (list): 2D list representing the game board cells. Each cell is a dict with "walls".
+            robots (dict): Mapping from robot color to position tuple (row, col).
+            target_color (str): The color of the robot that must reach the target.
+            target_pos (tuple): The target cell position (row, col).
+            max_depth (int): Maximum number of moves of the solution.
+            optimal (bool): Only accept solutions known to be optimal.
+
+        Returns:
+            dict: None on a miss, otherwise "moves" (list of (color, direction) moves,
+                  None if there is no solution within max_depth) and "optimal".
+        """
+        compiled_board, key = self._key(board, robots, target_color, target_pos)
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT length, moves, max_depth, optimal FROM solutions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                length, codes, searched_depth, entry_optimal = row
+                if optimal and not entry_optimal:
+                    row = None
+                elif length is None and searched_depth < max_depth:
+                    # Not searched deep enough to tell
+                    row = None
+                elif length is not None and length > max_depth and not entry_optimal:
+                    # Too long, but a shorter solution may exist within max_depth
+                    row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            with self.connection:
+                self.connection.execute("UPDATE solutions SET last_used = ? WHERE key = ?", (time.time(), key))
+        if length is None or length > max_depth:
+            return {"moves": None, "optimal": bool(entry_optimal)}
+        move_codes = array("H")
+        move_codes.frombytes(codes)
+        return {"moves": _replay(compiled_board, robots, move_codes), "optimal": bool(entry_optimal)}
+
+    def put(self, board, robots, target_color, target_pos, moves, max_depth=30, optimal=True):
+        """
+        Store the result of a search.
+
+        Args:
+            board (list): 2D list representing the game board cells. Each cell is a dict with "walls".
+            robots (dict): Mapping from robot color to position tuple (row, col).
+            target_color (str): The color of the robot that must reach the target.
+            target_pos (tuple): The target cell position (row, col).
+            moves (list): The (color, direction) moves found, None if there was no solution.
+            max_depth (int): Maximum number of moves the search was allowed.
+            optimal (bool): Whether the solver only returns optimal solutions. A None from a
+                            solver that isn't optimal proves nothing and is not stored; callers
+                            must not store the None of a cancelled or otherwise cut short search.
+        """
+        if moves is None and not optimal:
+            return
+        compiled_board = compile_board(board)
+        codec = StateCodec(compiled_board, robots, target_color)
+        target_cell = compiled_board.index(target_pos)
+        now = time.time()
+        rows = []
+        if moves is None:
+            key = self._state_key(compiled_board, codec.canonical(codec.pack(robots)), target_cell)
+            rows.append((key, None, None, max_depth, optimal, ROW_OVERHEAD + len(key), now))
+        else:
+            positions = dict(robots)
+            move_codes = array("H")
+            states = [codec.canonical(codec.pack(positions))]
+            for color, direction in moves:
+                move_codes.append((compiled_board.index(positions[color]) << 2) | DIRECTION_INDEX[direction])
+                others = [pos for other, pos in positions.items() if other != color]
+                positions[color] = compiled_board.move_position(positions[color], direction, others)
+                states.append(codec.canonical(codec.pack(positions)))
+            # Suffixes of an optimal solution are optimal, the rest of a suboptimal one may not be
+            for index, state in enumerate(states[:-1] if optimal else states[:1]):
+                key = self._state_key(compiled_board, state, target_cell)
+                codes = move_codes[index:].tobytes()
+                rows.append((key, len(moves) - index, codes, max_depth, optimal,
+                             ROW_OVERHEAD + len(key) + len(codes), now))
+        with self.lock:
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT INTO solutions (key, length, moves, max_depth, optimal, size, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET length = excluded.length, moves = excluded.moves, "
+                    "max_depth = excluded.max_depth, optimal = excluded.optimal, size = excluded.size, "
+                    "last_used = excluded.last_used "
+                    "WHERE excluded.optimal > solutions.optimal "
+                    "OR (excluded.optimal = solutions.optimal AND solutions.length IS NULL "
+                    "AND (excluded.length IS NOT NULL OR excluded.max_depth > solutions.max_depth))",
+                    rows,
+                )
+            self.bytes_since_check += sum(row[5] for row in rows)
+            if self.bytes_since_check >= EVICTION_CHECK_BYTES:
+                self._evict()
+
+    def solve(self, solver, progress_callback=None):
+        """
+        Answer a solver's puzzle from the cache, or run the solver and store its result.
+
+        Args:
+            solver (BaseSolver): The solver of the puzzle. Its result is stored as optimal
+                                 if solver.stats["optimal"] says so, or if the solver is
+                                 admissible when its stats don't tell. Solvers that can
+                                 find optimal solutions (see BaseSolver.finds_optimal)
+                                 are only answered by optimal entries.
+            progress_callback (callable): Passed to the solver; a search it cancels is not stored.
+
+        Returns:
+            list: A list of (color, direction) moves, or None if no solution is found.
+        """
+        puzzle = (solver.board, solver.initial_positions, solver.target_color, solver.target_pos)
+        entry = self.get(*puzzle, solver.max_depth, solver.finds_optimal())
+        if entry is not None:
+            solver.stats = {"expansions": 0, "generated": 0, "states_explored": 0, "cache_hit": True,
+                            "optimal": entry["optimal"]}
+            if progress_callback:
+                progress_callback(0)
+            return entry["moves"]
+
+        cancelled = False
+
+        def cache_progress_callback(states_explored):
+            nonlocal cancelled
+            if progress_callback and not progress_callback(states_explored):
+                cancelled = True
+                return False
+            return True
+
+        solution = solver.solve(cache_progress_callback if progress_callback else None)
+        if not cancelled:
+            self.put(*puzzle, solution, solver.max_depth, solver.stats.get("optimal", solver.admissible))
+        return solution
+
+    def _evict(self):
+        """Delete the least recently used entries while the cache is over max_bytes."""
+        self.bytes_since_check = 0
+        count, total = self.connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM solutions").fetchone()
+        if total <= self.max_bytes:
+            return
+        # Leave some room so eviction doesn't run again on the next insert
+        excess = total - self.max_bytes * 9 // 10
+        evicted = min(count, -(-excess * count // total))
+        with self.connection:
+            self.connection.execute(
+                "DELETE FROM solutions WHERE key IN (SELECT key FROM solutions ORDER BY last_used LIMIT ?)",
+                (evicted,),
+            )
+
+    def _key(self, board, robots, target_color, target_pos):
+        compiled_board = compile_board(board)
+        codec = StateCodec(compiled_board, robots, target_color)
+        state = codec.canonical(codec.pack(robots))
+        return compiled_board, self._state_key(compiled_board, state, compiled_board.index(target_pos))
+
+    def _state_key(self, compiled_board, state, target_cell):
+        """Hash of the wall layout, a canonical state and the target cell."""
+        return hashlib.blake2b(
+            f"{compiled_board.layout_key}:{target_cell}:{state:x}".encode(), digest_size=16
+        ).digest()
+
+
+def _replay(compiled_board, robots, move_codes):
+    """Convert move codes into (color, direction) moves by playing them from a placement."""
+    colors = list(robots.keys())
+    cells = [compiled_board.index(robots[color]) for color in colors]
+    moves = []
+    for code in move_codes:
+        cell, direction = code >> 2, code & 3
+        robot = cells.index(cell)
+        cells[robot] = compiled_board.slide(cell, direction, cells)
+        moves.append((colors[robot], DIRECTIONS[direction]))
+    return moves
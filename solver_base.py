@@ -0,0 +1,415 @@
+import time
+
+from board import DIRECTIONS, compile_board
+from budget import BUDGET_EXHAUSTED, CANCELLED, SOLVED, UNSOLVABLE, SearchResult, estimate_memory
+from distance_tables import UNREACHABLE
+from node_store import NodeStore
+from open_list import make_open_list
+from search_stats import SearchStats
+from state import StateCodec
+
+# Move code of the root node, which wasn't reached by any move
+NO_MOVE = 0xFFFF
+# visited value of states from which the target can't be reached
+DEAD = -1
+# A* node flags
+EXPANDED = 1
+UNPRUNED = 2
+# Weighted A* priorities are g + weight * h scaled by this, so weights are multiples of 1 / WEIGHT_SCALE
+WEIGHT_SCALE = 4
+
+class BaseSolver:
+    # Whether _heuristic never overestimates, so states with g + h > max_depth can be pruned
+    admissible = False
+
+    def __init__(self, board, initial_positions, target_color, target_pos, max_depth=30):
+        """
+        Args:
+            board (list): 2D list representing the game board cells. Each cell is a dict with "walls".
+            initial_positions (dict): Mapping from robot color to position tuple (row, col).
+            target_color (str): The color of the robot that must reach the target.
+            target_pos (tuple): The target cell position (row, col).
+            max_depth (int): Maximum number of moves (depth) to search.
+        """
+        self.board = board
+        self.initial_positions = initial_positions
+        self.target_color = target_color
+        self.target_pos = target_pos
+        self.max_depth = max_depth
+        self.compiled_board = compile_board(board)
+        self.codec = StateCodec(self.compiled_board, initial_positions, target_color)
+        self.target_cell = self.compiled_board.index(target_pos)
+        # Counters of the last search, filled in when it returns
+        self.stats = {}
+        self.pruned_moves = 0
+        # SearchResult of the last A* search (see BaseAStarSolver.a_star_search)
+        self.result = None
+
+    def _is_goal(self, state):
+        """Check if the target robot reached the target cell."""
+        return state & self.codec.cell_mask == self.target_cell
+
+    def _heuristic(self, state):
+        """Estimate the number of moves left from a packed state."""
+        raise NotImplementedError
+
+    def finds_optimal(self):
+        """
+        Check if the solver can return optimal solutions, in which case only
+        optimal solution cache entries answer for it (see SolutionCache.solve).
+        Whether a given result is optimal is in stats["optimal"] when it varies.
+        """
+        return self.admissible
+
+    def _heuristic_memory(self):
+        """Approximate bytes held by memos of the heuristic, counted in search budgets and stats."""
+        return 0
+
+    def _goal_path(self, state):
+        """Return the move codes that finish a solution from a goal state (none unless _is_goal is overridden)."""
+        return []
+
+    def _successors(self, state, last_move=NO_MOVE):
+        """
+        Generate every canonical state reachable with a single robot move.
+
+        Moves are encoded by the cell the robot leaves and the direction
+        (cell * 4 + direction), which stays meaningful whatever helper ended up
+        in which slot.
+
+        Given the move that led to the state, moves that can't be part of a
+        shorter or canonical solution are pruned (counted in self.pruned_moves):
+        moving the same robot again in the same direction (it can't move) or
+        straight back (its parent reaches that state in one move), and moving
+        another robot that doesn't interact with the last move from a lower
+        cell, since the same two moves in the other order are kept.
+
+        Yields:
+            (int, int): Move code and the new canonical state.
+        """
+        codec = self.codec
+        compiled_board = self.compiled_board
+        slide = compiled_board.slide
+        rays = compiled_board.rays
+        cells = codec.cells(state)
+        target = cells[0]
+        helpers = cells[1:]
+
+        last_cell = -1
+        if last_move != NO_MOVE:
+            first_cell, last_direction = last_move >> 2, last_move & 3
+            # The move code is also the index of the ray the last robot slid along;
+            # it stopped on the first occupied cell of that ray
+            last_ray = rays[last_move]
+            last_cell = min((cell for cell in cells if cell in last_ray), key=last_ray.get)
+            last_steps = last_ray[last_cell]
+
+        for index, cell in enumerate(cells):
+            for direction in range(4):
+                if cell == last_cell:
+                    if direction == last_direction:
+                        continue
+                    if direction == last_direction ^ 1:
+                        self.pruned_moves += 1
+                        continue
+                stop = slide(cell, direction, cells)
+                if stop == cell:
+                    continue
+                move = (cell << 2) | direction
+                if last_cell >= 0 and cell < first_cell and cell != last_cell:
+                    ray = rays[move]
+                    steps = ray[stop]
+                    # Independent unless one robot blocks the other, before or after its move
+                    if (ray.get(last_cell) != steps + 1
+                            and ray.get(first_cell, steps + 1) > steps
+                            and last_ray.get(cell) != last_steps + 1
+                            and last_ray.get(stop, last_steps + 1) > last_steps):
+                        self.pruned_moves += 1
+                        continue
+                if index == 0:
+                    yield move, state + stop - target
+                else:
+                    new_helpers = helpers[:index - 1] + helpers[index:] + [stop]
+                    new_helpers.sort()
+                    yield move, codec.pack_cells(target, new_helpers)
+
+    def _to_moves(self, move_codes):
+        """
+        Convert move codes back into (color, direction) moves by replaying them
+        from the initial positions.
+        """
+        compiled_board = self.compiled_board
+        colors = list(self.initial_positions.keys())
+        cells = [compiled_board.index(self.initial_positions[color]) for color in colors]
+        moves = []
+        for code in move_codes:
+            cell, direction = code >> 2, code & 3
+            robot = cells.index(cell)
+            cells[robot] = compiled_board.slide(cell, direction, cells)
+            moves.append((colors[robot], DIRECTIONS[direction]))
+        return moves
+
+
+class BaseAStarSolver(BaseSolver):
+    def solve(self, progress_callback=None):
+        """Find a solution with the solver's default search, see a_star_search."""
+        return self.a_star_search(progress_callback)
+
+    def search(self, budget=None, progress_callback=None, **kwargs):
+        """
+        Run a_star_search and return its SearchResult instead of just the moves.
+
+        Args:
+            budget (SearchBudget): Time, expansion and memory limits, None for none.
+            progress_callback (callable): Optional callback function to report progress
+                                        and check for cancellation
+            **kwargs: Other arguments of a_star_search.
+
+        Returns:
+            SearchResult: The status, solution or best partial progress, and lower bound.
+        """
+        self.a_star_search(progress_callback, budget=budget, **kwargs)
+        return self.result
+
+    def a_star_search(self, progress_callback=None, open_list="bucket", prune_moves=True, weight=1, bound=None,
+                      budget=None, profile=False, trace_memory=False, snapshot_callback=None,
+                      snapshot_interval=1.0):
+        """
+        Run the A* search to find a sequence of moves that leads the target robot to the target.
+
+        With a weight above 1, nodes are ordered by g + weight * h (weighted A*),
+        which can find a solution with fewer expansions, at most weight times
+        longer than the optimal one. States reached again with a lower cost are expanded
+        again, so every state within the bound is still searched before
+        giving up.
+
+        Whatever the outcome, self.result is set to a SearchResult. When the
+        budget runs out or the search is cancelled, its lower bound is the
+        lowest f = g + h left in the open list (A* pops nodes in order of f, so
+        no solution is shorter), and its partial moves lead to the stored state
+        with the lowest h.
+
+        self.stats holds the counters of _record_stats and the statistics of
+        SearchStats.summary: duplicates, stale pops, peak sizes, speed, memory,
+        and the time spent in each phase or the traced peak memory when asked for.
+
+        Args:
+            progress_callback (callable): Optional callback function to report progress
+                                        and check for cancellation
+            open_list (str or type): Open list implementation, 'bucket' (default) or 'heap',
+                                     or a class with push(f_cost, g_cost, node), pop() and len().
+            prune_moves (bool): Skip successors that can't lead to a shorter solution (see _successors).
+            weight (float): Weight of the heuristic, rounded to a multiple of 1 / WEIGHT_SCALE.
+            bound (int): Maximum number of moves of the solution, max_depth if None. With an
+                         admissible heuristic, states with g + h above it are pruned.
+            budget (SearchBudget): Time, expansion and memory limits, None for none.
+            profile (bool): Time the heuristic, successor generation and open list (see SearchStats).
+            trace_memory (bool): Measure the peak memory with tracemalloc, several times slower.
+            snapshot_callback (callable): Optional callback receiving a copy of self.stats
+                                          every snapshot_interval seconds during the search.
+            snapshot_interval (float): Seconds between two snapshots.
+
+        Returns:
+            list: A list of (color, direction) moves, or None if no solution is found.
+        """
+        self.stats = {"expansions": 0, "generated": 0, "states_explored": 1}
+        self.pruned_moves = 0
+        if bound is None:
+            bound = self.max_depth
+        # Priority is g_weight * g + h_weight * h, plain f = g + h without a weight
+        if weight == 1:
+            g_weight, h_weight = 1, 1
+        else:
+            g_weight, h_weight = WEIGHT_SCALE, round(weight * WEIGHT_SCALE)
+        open_set = make_open_list(open_list)
+        # Best node of every state reached so far, DEAD for states that can't reach the target
+        visited = {}
+        nodes = NodeStore(self.codec.state_bits)
+        # Per node: EXPANDED once expanded, UNPRUNED if it must be expanded without move pruning
+        node_flags = bytearray()
+        start_state = self.codec.canonical(self.codec.pack(self.initial_positions))
+        h_cost = self._heuristic(start_state)
+        if h_cost == UNREACHABLE:
+            self.result = SearchResult(UNSOLVABLE, lower_bound=bound + 1, stats=self.stats)
+            if progress_callback:
+                progress_callback(1)
+            return None
+        if budget is not None:
+            budget.start()
+        search_stats = SearchStats(profile, trace_memory)
+        search_stats.start()
+        heuristic = self._heuristic
+        successors = self._successors
+        if profile:
+            heuristic = search_stats.timed("heuristic", heuristic)
+            successors = search_stats.timed_generator("successors", successors)
+            open_set = search_stats.timed_open_list(open_set)
+        root = nodes.add(start_state, -1, NO_MOVE, 0)
+        node_flags.append(0)
+        open_set.push(h_weight * h_cost, 0, root)
+        visited[start_state] = root
+        iterations = 0
+        expansions = 0
+        generated = 0
+        states_explored = 0
+        duplicates = 0
+        stale_pops = 0
+        open_peak = 1
+        # Stored node with the lowest h, the best partial progress
+        best_node = root
+        best_h_cost = h_cost
+
+        last_report_time = time.time()
+        next_snapshot_time = time.perf_counter() + snapshot_interval
+
+        while open_set:
+            # Report progress every 100 expansions or every 0.5 seconds
+            states_explored = len(visited)
+            iterations += 1
+            if progress_callback:
+                current_time = time.time()
+                if iterations % 100 == 0 or current_time - last_report_time > 0.5:
+                    last_report_time = current_time
+                    if not progress_callback(states_explored):
+                        # If callback returns False, the search was cancelled
+                        self._record_search_stats(search_stats, expansions, generated, states_explored, duplicates,
+                                                  stale_pops, open_peak, nodes)
+                        self._stop_result(CANCELLED, None, open_set, visited, nodes, best_node, best_h_cost,
+                                          h_cost, weight)
+                        return None
+            if budget is not None:
+                exhausted = budget.exhausted(expansions, estimate_memory(nodes, self._heuristic_memory()))
+                if exhausted:
+                    self._record_search_stats(search_stats, expansions, generated, states_explored, duplicates,
+                                              stale_pops, open_peak, nodes)
+                    self._stop_result(BUDGET_EXHAUSTED, exhausted, open_set, visited, nodes, best_node,
+                                      best_h_cost, h_cost, weight)
+                    if progress_callback:
+                        progress_callback(states_explored)
+                    return None
+            if snapshot_callback and iterations % 100 == 0:
+                current_time = time.perf_counter()
+                if current_time >= next_snapshot_time:
+                    next_snapshot_time = current_time + snapshot_interval
+                    self._record_search_stats(search_stats, expansions, generated, states_explored, duplicates,
+                                              stale_pops, open_peak, nodes, finished=False)
+                    snapshot_callback(dict(self.stats))
+
+            node = open_set.pop()
+            current_state = nodes.states[node]
+            g_cost = nodes.g_costs[node]
+            # Skip stale entries: the state got a better node after this one was pushed.
+            if visited[current_state] != node:
+                stale_pops += 1
+                continue
+            if self._is_goal(current_state):
+                # Report final stats before returning
+                self._record_search_stats(search_stats, expansions, generated, states_explored, duplicates,
+                                          stale_pops, open_peak, nodes)
+                if progress_callback:
+                    progress_callback(states_explored)
+                moves = self._to_moves(nodes.path(node) + self._goal_path(current_state))
+                if not self.admissible:
+                    lower_bound = 0
+                elif weight == 1:
+                    lower_bound = len(moves)
+                else:
+                    lower_bound = max(h_cost, -(-len(moves) * g_weight // h_weight))
+                self.result = SearchResult(SOLVED, moves, lower_bound, moves, 0, stats=self.stats)
+                return moves
+            if g_cost >= bound:
+                continue
+            expansions += 1
+            node_flags[node] |= EXPANDED
+
+            if prune_moves and not node_flags[node] & UNPRUNED:
+                last_move = nodes.moves[node]
+            else:
+                last_move = NO_MOVE
+            new_g_cost = g_cost + 1
+            for move, new_state in successors(current_state, last_move):
+                generated += 1
+                flags = 0
+                other = visited.get(new_state)
+                if other is not None:
+                    if other == DEAD:
+                        duplicates += 1
+                        continue
+                    other_g_cost = nodes.g_costs[other]
+                    # Prune states that have already been reached with a lower cost.
+                    if other_g_cost < new_g_cost:
+                        duplicates += 1
+                        continue
+                    if other_g_cost == new_g_cost:
+                        # Move pruning depends on the last move, so a state reached at the same
+                        # cost through another move must be expanded without it to stay optimal
+                        if not prune_moves or node_flags[other] & UNPRUNED:
+                            duplicates += 1
+                            continue
+                        if not node_flags[other] & EXPANDED:
+                            node_flags[other] |= UNPRUNED
+                            duplicates += 1
+                            continue
+                        flags = UNPRUNED
+                new_h_cost = heuristic(new_state)
+                if new_h_cost == UNREACHABLE:
+                    visited[new_state] = DEAD
+                    continue
+                if self.admissible and new_g_cost + new_h_cost > bound:
+                    continue
+                child = nodes.add(new_state, node, move, new_g_cost)
+                node_flags.append(flags)
+                visited[new_state] = child
+                open_set.push(g_weight * new_g_cost + h_weight * new_h_cost, new_g_cost, child)
+                if new_h_cost < best_h_cost:
+                    best_node = child
+                    best_h_cost = new_h_cost
+            if len(open_set) > open_peak:
+                open_peak = len(open_set)
+
+        # Report final stats before returning None
+        states_explored = len(visited)
+        self._record_search_stats(search_stats, expansions, generated, states_explored, duplicates, stale_pops,
+                                  open_peak, nodes)
+        if progress_callback:
+            progress_callback(states_explored)
+        # If no solution is found within maximum depth, return None.
+        self.result = SearchResult(UNSOLVABLE, None, bound + 1, self._to_moves(nodes.path(best_node)),
+                                   best_h_cost, stats=self.stats)
+        return None
+
+    def _stop_result(self, status, exhausted, open_set, visited, nodes, best_node, best_h_cost, start_h_cost,
+                     weight):
+        """Set self.result for a search stopped before it could finish."""
+        lower_bound = start_h_cost if self.admissible else 0
+        if self.admissible and weight == 1:
+            # The first live node popped has the lowest f left
+            while open_set:
+                node = open_set.pop()
+                state = nodes.states[node]
+                if visited[state] == node:
+                    lower_bound = max(lower_bound, nodes.g_costs[node] + self._heuristic(state))
+                    break
+        self.result = SearchResult(status, None, lower_bound, self._to_moves(nodes.path(best_node)), best_h_cost,
+                                   exhausted, self.stats)
+
+    def _record_search_stats(self, search_stats, expansions, generated, states_explored, duplicates, stale_pops,
+                             open_peak, nodes, finished=True):
+        """Store the counters and the SearchStats summary of an A* search in self.stats."""
+        if finished:
+            search_stats.stop()
+        self._record_stats(expansions, generated, states_explored)
+        self.stats.update(search_stats.summary(expansions, duplicates, stale_pops, open_peak, states_explored, nodes,
+                                                self._heuristic_memory()))
+
+    def _record_stats(self, expansions, generated, states_explored):
+        """Store the counters of the search that just ended in self.stats."""
+        self.stats = {
+            "expansions": expansions,
+            "generated": generated,
+            "states_explored": states_explored,
+            "pruned_moves": self.pruned_moves,
+            # Children per expansion, with move pruning and as they would be without it
+            "branching_factor": generated / expansions if expansions else 0.0,
+            "unpruned_branching_factor": (generated + self.pruned_moves) / expansions if expansions else 0.0,
+        }
@@ -0,0 +1,531 @@
+"""
+Local solver service.
+
+Serves solves to other programs over a Unix socket (or TCP on localhost),
+with the solvers running in a pool of worker processes:
+
+    python solver_service.py --socket /tmp/ricochet.sock --workers 4
+
+The protocol is JSON lines in both directions. A client sends requests,
+several at a time if it likes, each with an id of its choosing:
+
+    {"id": 1, "puzzle": {"walls": ..., "robots": ..., "target_color": ..., "target": ...},
+     "solver": "robot_aware", "max_depth": 30, "deadline": 10}
+    {"cancel": 1}
+
+and receives events tagged with the same id: "queued", "started",
+"progress" (states explored so far) and exactly one "result", whose status
+is 'solved', 'unsolved', 'timeout' (the deadline passed), 'cancelled',
+'busy' (the queue is full, try again later) or 'error'. Closing the
+connection cancels its requests.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from collections import OrderedDict
+
+from batch_solve import solve_result
+from game_core import Puzzle
+from solution_cache import SolutionCache
+from solvers import SOLVERS, is_admissible, make_solver
+
+DEFAULT_SOCKET = os.path.join(os.path.expanduser("~"), ".ricochet_robots", "solver.sock")
+# Seconds between two progress events of a job
+PROGRESS_INTERVAL = 0.5
+# Seconds a worker gets to stop a cancelled search before it is killed and replaced
+CANCEL_GRACE = 2.0
+# Progress events are skipped for a client with more unsent bytes than this
+MAX_WRITE_BUFFER = 1 << 20
+
+
+def _worker_main(conn):
+    """
+    Entry point of a worker process: run the jobs received on conn until None.
+
+    Receives ("solve", job_id, record, solver_type, max_depth) and
+    ("cancel", job_id), sends ("progress", job_id, states_explored) and
+    ("done", job_id, result). A None received during a search stops it, and
+    the worker exits without sending its result.
+    """
+    # Ctrl-C reaches the whole process group; the service stops its workers itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Exit through the finally blocks when killed, so hda_star stops its own worker processes
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(1))
+    stopping = False
+    while not stopping:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        if not isinstance(message, tuple) or message[0] != "solve":
+            # A cancel that arrived after its job was done
+            continue
+        _, job_id, record, solver_type, max_depth = message
+        cancelled = False
+        last_report_time = time.monotonic()
+
+        def progress_callback(states_explored):
+            nonlocal cancelled, stopping, last_report_time
+            while not stopping and conn.poll():
+                try:
+                    request = conn.recv()
+                except EOFError:
+                    request = None
+                if request is None:
+                    # The service is shutting down (or gone)
+                    stopping = True
+                elif isinstance(request, tuple) and request[:2] == ("cancel", job_id):
+                    cancelled = True
+            if cancelled or stopping:
+                return False
+            current_time = time.monotonic()
+            if current_time - last_report_time > PROGRESS_INTERVAL:
+                last_report_time = current_time
+                conn.send(("progress", job_id, states_explored))
+            return True
+
+        start = time.perf_counter()
+        try:
+            solver = make_solver(solver_type, Puzzle.from_dict(record), max_depth)
+            solution = solver.solve(progress_callback)
+            status = "solved" if solution is not None else "cancelled" if cancelled else "unsolved"
+            result = solve_result(status, solution, solver.stats.get("states_explored", 0),
+                                  time.perf_counter() - start)
+        except Exception as error:
+            result = {"status": "error", "error": f"{type(error).__name__}: {error}"}
+        if not stopping:
+            conn.send(("done", job_id, result))
+
+
+class Worker:
+    def __init__(self, context):
+        """
+        A worker process and the service end of its pipe.
+
+        Not a daemon process: those can't start children, which hda_star needs.
+        SolverService.close stops the workers instead.
+        """
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,))
+        self.process.start()
+        child_conn.close()
+        self.job = None
+        self.kill_timer = None
+
+
+class Job:
+    def __init__(self, job_id, key, record, puzzle, solver_type, max_depth):
+        """
+        One search, shared by every identical request (same puzzle, solver and depth).
+
+        Attributes:
+            subscribers (dict): {(client, request id): deadline timer handle or None}.
+        """
+        self.id = job_id
+        self.key = key
+        self.record = record
+        self.puzzle = puzzle
+        self.solver_type = solver_type
+        self.max_depth = max_depth
+        self.subscribers = {}
+        self.worker = None
+        self.start_time = None
+
+
+class Client:
+    def __init__(self, writer):
+        """A connection and its pending requests, {request id: Job}."""
+        self.writer = writer
+        self.requests = {}
+
+    def send(self, request_id, event, **fields):
+        """Write an event, skipping progress events while the client is behind on reading."""
+        if self.writer.is_closing():
+            return
+        if event == "progress" and self.writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+            return
+        line = json.dumps({"id": request_id, "event": event, **fields}, separators=(",", ":"))
+        self.writer.write(line.encode("utf-8") + b"\n")
+
+
+class SolverService:
+    def __init__(self, workers=None, max_queue=64, cache=None):
+        """
+        Queue solve requests onto a pool of worker processes.
+
+        Identical requests in flight are coalesced into one job, which is
+        cancelled once none of its requests wants it any more: cancelled,
+        past its deadline or disconnected. A running job is cancelled through
+        its worker's pipe, checked at every progress callback of the search,
+        and the worker is killed and replaced if it doesn't stop within
+        CANCEL_GRACE seconds. New jobs beyond max_queue waiting ones are
+        refused with a 'busy' result rather than piling up.
+
+        Args:
+            workers (int): Number of worker processes, None for one per CPU.
+            max_queue (int): Jobs waiting for a worker before requests are refused.
+            cache (SolutionCache): Cache answering requests before they are queued, and
+                                   updated with the results, None for none. Its SQLite
+                                   calls run in the loop's default executor.
+        """
+        self.num_workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.cache = cache
+        # Forked workers would inherit the client sockets open at the time, and keep them open
+        self.context = multiprocessing.get_context("spawn")
+        self.workers = []
+        self.queue = OrderedDict()
+        self.jobs = {}
+        self.job_ids = itertools.count(1)
+        # Cache updates still running in the executor
+        self.cache_writes = set()
+        # Handler tasks of the open connections, by Client
+        self.connections = {}
+        self.loop = None
+        self.server = None
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        for _ in range(self.num_workers):
+            self._add_worker()
+
+    async def serve_unix(self, path=DEFAULT_SOCKET):
+        """Start the workers and listen on a Unix socket, replacing a stale socket file."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(path):
+            os.unlink(path)
+        await self.start()
+        self.server = await asyncio.start_unix_server(self.handle_client, path)
+        return self.server
+
+    async def serve_tcp(self, host="127.0.0.1", port=8765):
+        """Start the workers and listen on a TCP port."""
+        await self.start()
+        self.server = await asyncio.start_server(self.handle_client, host, port)
+        return self.server
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        # Let the handlers cancel their requests and return, rather than be cancelled with the loop
+        for client in list(self.connections):
+            client.writer.close()
+        if self.connections:
+            await asyncio.wait(list(self.connections.values()))
+        for worker in self.workers:
+            self.loop.remove_reader(worker.conn.fileno())
+            if worker.kill_timer is not None:
+                worker.kill_timer.cancel()
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+        for worker in self.workers:
+            await self.loop.run_in_executor(None, worker.process.join, 1.0)
+            if worker.process.is_alive():
+                worker.process.terminate()
+                worker.process.join()
+            worker.conn.close()
+        self.workers = []
+        if self.cache_writes:
+            await asyncio.wait(self.cache_writes)
+
+    async def handle_client(self, reader, writer):
+        """Read the requests of a connection until it closes, then cancel what is left."""
+        client = Client(writer)
+        self.connections[client] = asyncio.current_task()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    message = json.loads(line)
+                    if not isinstance(message, dict):
+                        raise ValueError("a request must be a JSON object")
+                except ValueError as error:
+                    client.send(None, "result", status="error", error=f"invalid request: {error}")
+                    continue
+                if "cancel" in message:
+                    self.cancel(client, message["cancel"])
+                else:
+                    await self.submit(client, message)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for request_id in list(client.requests):
+                self._unsubscribe(client, request_id)
+            writer.close()
+            del self.connections[client]
+
+    async def submit(self, client, message):
+        """Answer a request from the cache, join an identical job, or queue a new one."""
+        request_id = message.get("id")
+        if not isinstance(request_id, (int, str)):
+            client.send(None, "result", status="error", error="invalid request: the id must be a number or a string")
+            return
+        if request_id in client.requests:
+            client.send(request_id, "result", status="error", error="a request with this id is pending")
+            return
+        try:
+            solver_type = message.get("solver", "reachability")
+            if solver_type not in SOLVERS:
+                raise ValueError(f"unknown solver {solver_type!r}")
+            max_depth = int(message.get("max_depth", 30))
+            deadline = message.get("deadline")
+            deadline = float(deadline) if deadline is not None else None
+            puzzle = Puzzle.from_dict(message["puzzle"])
+            record = puzzle.to_dict()
+        except (ValueError, KeyError, TypeError, AttributeError) as error:
+            client.send(request_id, "result", status="error", error=f"invalid request: {error}")
+            return
+
+        if self.cache is not None:
+            start = time.perf_counter()
+            entry = await self.loop.run_in_executor(
+                None, self.cache.get, puzzle.board, puzzle.robots, puzzle.target_color, puzzle.target_pos,
+                max_depth, is_admissible(solver_type))
+            if entry is not None:
+                status = "solved" if entry["moves"] is not None else "unsolved"
+                client.send(request_id, "result",
+                            **solve_result(status, entry["moves"], 0, time.perf_counter() - start, True))
+                return
+
+        key = (json.dumps(record, sort_keys=True), solver_type, max_depth)
+        job = self.jobs.get(key)
+        coalesced = job is not None
+        if job is None:
+            if len(self.queue) >= self.max_queue:
+                client.send(request_id, "result", status="busy", error="the queue is full")
+                return
+            job = Job(next(self.job_ids), key, record, puzzle, solver_type, max_depth)
+            self.jobs[key] = job
+            self.queue[job.id] = job
+        timer = None
+        if deadline is not None:
+            timer = self.loop.call_later(deadline, self._expire, client, request_id)
+        job.subscribers[(client, request_id)] = timer
+        client.requests[request_id] = job
+        if job.worker is None:
+            client.send(request_id, "queued", position=list(self.queue).index(job.id), coalesced=coalesced)
+        else:
+            client.send(request_id, "started", coalesced=coalesced)
+        self._dispatch()
+
+    def cancel(self, client, request_id):
+        if request_id in client.requests:
+            self._unsubscribe(client, request_id)
+            client.send(request_id, "result", status="cancelled")
+
+    def _expire(self, client, request_id):
+        job = client.requests.get(request_id)
+        if job is not None:
+            self._unsubscribe(client, request_id)
+            client.send(request_id, "result", status="timeout")
+
+    def _unsubscribe(self, client, request_id):
+        """Drop a request from its job, cancelling the job if it was the last one."""
+        job = client.requests.pop(request_id)
+        timer = job.subscribers.pop((client, request_id))
+        if timer is not None:
+            timer.cancel()
+        if job.subscribers:
+            return
+        del self.jobs[job.key]
+        if job.worker is None:
+            del self.queue[job.id]
+            return
+        worker = job.worker
+        try:
+            worker.conn.send(("cancel", job.id))
+        except OSError:
+            pass
+        worker.kill_timer = self.loop.call_later(CANCEL_GRACE, self._kill, worker, job)
+
+    def _kill(self, worker, job):
+        """Replace a worker that didn't stop a cancelled job in time."""
+        worker.kill_timer = None
+        if worker.job is job:
+            worker.process.terminate()
+
+    def _add_worker(self):
+        worker = Worker(self.context)
+        self.workers.append(worker)
+        self.loop.add_reader(worker.conn.fileno(), self._on_worker_message, worker)
+        self._dispatch()
+
+    def _dispatch(self):
+        """Hand queued jobs to idle workers, oldest first."""
+        for worker in self.workers:
+            if not self.queue:
+                return
+            if worker.job is not None:
+                continue
+            _, job = self.queue.popitem(last=False)
+            job.worker = worker
+            job.start_time = time.perf_counter()
+            worker.job = job
+            worker.conn.send(("solve", job.id, job.record, job.solver_type, job.max_depth))
+            for client, request_id in job.subscribers:
+                client.send(request_id, "started")
+
+    def _on_worker_message(self, worker):
+        try:
+            message = worker.conn.recv()
+        except (EOFError, OSError):
+            self._replace_worker(worker)
+            return
+        kind, job_id, payload = message
+        job = worker.job
+        if job is None or job.id != job_id:
+            return
+        if kind == "progress":
+            elapsed = round(time.perf_counter() - job.start_time, 3)
+            for client, request_id in job.subscribers:
+                client.send(request_id, "progress", states_explored=payload, elapsed=elapsed)
+            return
+        self._finish(worker)
+        if payload["status"] == "cancelled":
+            return
+        self._publish(job, payload)
+        if self.cache is not None and payload["status"] in ("solved", "unsolved"):
+            moves = [tuple(move) for move in payload["moves"]] if payload["moves"] is not None else None
+            write = self.loop.run_in_executor(
+                None, self.cache.put, job.puzzle.board, job.puzzle.robots, job.puzzle.target_color,
+                job.puzzle.target_pos, moves, job.max_depth, is_admissible(job.solver_type))
+            self.cache_writes.add(write)
+            write.add_done_callback(self._cache_written)
+
+    def _cache_written(self, write):
+        self.cache_writes.discard(write)
+        if not write.cancelled() and write.exception() is not None:
+            print(f"Could not update the solution cache: {write.exception()}", file=sys.stderr)
+
+    def _finish(self, worker):
+        """Free a worker and forget its job."""
+        job = worker.job
+        worker.job = None
+        if worker.kill_timer is not None:
+            worker.kill_timer.cancel()
+            worker.kill_timer = None
+        if self.jobs.get(job.key) is job:
+            del self.jobs[job.key]
+        self._dispatch()
+
+    def _publish(self, job, result):
+        """Send the result of a job to every request still waiting for it."""
+        for client, request_id in list(job.subscribers):
+            timer = job.subscribers.pop((client, request_id))
+            if timer is not None:
+                timer.cancel()
+            client.requests.pop(request_id, None)
+            client.send(request_id, "result", **result)
+
+    def _replace_worker(self, worker):
+        """Start a new worker in place of one that died or was killed."""
+        self.loop.remove_reader(worker.conn.fileno())
+        worker.conn.close()
+        # A killed worker may still be stopping the processes of its search
+        self.loop.run_in_executor(None, worker.process.join)
+        self.workers.remove(worker)
+        job = worker.job
+        if job is not None:
+            if worker.kill_timer is not None:
+                worker.kill_timer.cancel()
+            if self.jobs.get(job.key) is job:
+                del self.jobs[job.key]
+            self._publish(job, {"status": "error", "error": "the worker process died"})
+        self._add_worker()
+
+
+async def solve(puzzle, path=DEFAULT_SOCKET, solver_type="reachability", max_depth=30, deadline=None,
+                progress_callback=None):
+    """
+    Solve a puzzle with a running service, see the protocol above.
+
+    Cancelling the task running this coroutine closes the connection, which
+    cancels the search.
+
+    Args:
+        puzzle (Puzzle): The puzzle to solve.
+        path (str): The Unix socket of the service.
+        solver_type (str): See make_solver.
+        max_depth (int): Maximum number of moves (depth) to search.
+        deadline (float): Seconds after which the service gives up, None for no limit.
+        progress_callback (callable): Optional callback taking every event before the result.
+
+    Returns:
+        dict: The "result" event.
+    """
+    reader, writer = await asyncio.open_unix_connection(path)
+    try:
+        request = {"id": 1, "puzzle": puzzle.to_dict(), "solver": solver_type, "max_depth": max_depth,
+                   "deadline": deadline}
+        writer.write(json.dumps(request).encode("utf-8") + b"\n")
+        await writer.drain()
+        while True:
+            line = await reader.readline()
+            if not line:
+                raise ConnectionError("the service closed the connection")
+            event = json.loads(line)
+            if event["event"] == "result":
+                return event
+            if progress_callback:
+                progress_callback(event)
+    finally:
+        writer.close()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Serve Ricochet Robots solves over a local socket.")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help=f"Unix socket path (default {DEFAULT_SOCKET})")
+    parser.add_argument("--port", type=int, help="listen on this TCP port of --host instead of a Unix socket")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--workers", type=int, default=0, help="number of worker processes, 0 for one per CPU")
+    parser.add_argument("--max-queue", type=int, default=64, help="waiting jobs before requests are refused")
+    parser.add_argument("--cache", metavar="PATH", help="SQLite solution cache to check first and update")
+    parser.add_argument("--cache-size", type=int, default=64, metavar="MB", help="size limit of the cache")
+    return parser
+
+
+async def serve(args):
+    cache = SolutionCache(args.cache, args.cache_size << 20) if args.cache else None
+    service = SolverService(args.workers or None, args.max_queue, cache)
+    try:
+        if args.port is not None:
+            server = await service.serve_tcp(args.host, args.port)
+        else:
+            server = await service.serve_unix(args.socket)
+        addresses = ", ".join(str(sock.getsockname()) for sock in server.sockets)
+        print(f"Serving on {addresses} with {service.num_workers} workers", file=sys.stderr)
+        await server.serve_forever()
+    finally:
+        await service.close()
+        if cache is not None:
+            cache.close()
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import importlib
+
+# Module, solver class and extra constructor arguments, by solver type. Modules are
+# imported on first use, so optional dependencies (NumPy for vector_bfs) are only
+# needed by the solvers that use them.
+SOLVERS = {
+    "manhattan": ("manhattan_a_star", "AStarSolver", {}),
+    "reachability": ("reachability_a_star", "ReachabilityAStarSolver", {}),
+    "robot_aware": ("reachability_a_star", "ReachabilityAStarSolver", {"heuristic": "robot_aware"}),
+    "ida_star": ("ida_star", "IDAStarSolver", {}),
+    "hda_star": ("hda_star", "HDAStarSolver", {"heuristic": "robot_aware"}),
+    # Reuses one search for all the puzzles sharing a board and robot placement
+    "all_targets": ("all_targets", "AllTargetsSolver", {}),
+    # Weighted A* searches down to plain A*, only the final optimal solution is kept
+    "anytime": ("anytime", "AnytimeSolver", {"heuristic": "robot_aware"}),
+    # Requires NumPy
+    "vector_bfs": ("vector_bfs", "VectorBFSSolver", {}),
+}
+
+
+def solver_class(solver_type):
+    """Return the solver class of a solver type (a key of SOLVERS), importing its module."""
+    if solver_type not in SOLVERS:
+        raise ValueError(f"Unknown solver: {solver_type!r}")
+    module_name, class_name, _ = SOLVERS[solver_type]
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def is_admissible(solver_type):
+    """Check if a solver type always returns optimal solutions."""
+    return solver_class(solver_type).admissible
+
+
+def make_solver(solver_type, puzzle, max_depth=30):
+    """Create the solver of the given type (a key of SOLVERS) for a puzzle."""
+    cls = solver_class(solver_type)
+    kwargs = SOLVERS[solver_type][2]
+    return cls(puzzle.board, puzzle.robots, puzzle.target_color, puzzle.target_pos, max_depth=max_depth, **kwargs)
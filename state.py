@@ -0,0 +1,57 @@
+class StateCodec:
+    def __init__(self, compiled_board, initial_positions, target_color):
+        """
+        Pack robot placements into a single int so search states are cheap to
+        copy, hash and compare.
+
+        Every robot gets a fixed slot of cell_bits bits holding its flat cell
+        index (8 bits on a 16x16 board). The target robot always lives in slot 0,
+        the other robots follow in the order of initial_positions.
+
+        For solving, only the positions of the helper robots matter, not which
+        helper is where. canonical() sorts the helper slots so every such layout
+        maps to one state; canonical states can't be unpacked back to colors.
+
+        Args:
+            compiled_board (CompiledBoard): The board the positions refer to.
+            initial_positions (dict): Mapping from robot color to position tuple (row, col).
+            target_color (str): The color of the robot that must reach the target.
+        """
+        self.compiled_board = compiled_board
+        self.color_order = list(initial_positions.keys())
+        self.colors = [target_color] + [color for color in self.color_order if color != target_color]
+        self.num_robots = len(self.colors)
+        self.cell_bits = max(8, (compiled_board.num_cells - 1).bit_length())
+        self.cell_mask = (1 << self.cell_bits) - 1
+        self.shifts = [slot * self.cell_bits for slot in range(self.num_robots)]
+        self.state_bits = self.num_robots * self.cell_bits
+
+    def pack(self, positions):
+        """Pack a {color: (row, col)} mapping into an int state."""
+        state = 0
+        for color, shift in zip(self.colors, self.shifts):
+            state |= self.compiled_board.index(positions[color]) << shift
+        return state
+
+    def unpack(self, state):
+        """Unpack an int state into a {color: (row, col)} mapping."""
+        cells = self.cells(state)
+        positions = {color: self.compiled_board.position(cell) for color, cell in zip(self.colors, cells)}
+        return {color: positions[color] for color in self.color_order}
+
+    def cells(self, state):
+        """Return the flat cell index of every robot, in slot order."""
+        mask = self.cell_mask
+        return [(state >> shift) & mask for shift in self.shifts]
+
+    def canonical(self, state):
+        """Return the canonical form of a state, with the helper cells sorted."""
+        cells = self.cells(state)
+        return self.pack_cells(cells[0], sorted(cells[1:]))
+
+    def pack_cells(self, target_cell, helper_cells):
+        """Pack the target robot cell and the helper cells, in slot order, into an int state."""
+        state = target_cell
+        for cell, shift in zip(helper_cells, self.shifts[1:]):
+            state |= cell << shift
+        return state
@@ -0,0 +1,269 @@
+import mmap
+import os
+import struct
+import time
+from itertools import combinations
+from math import comb
+
+from board import compile_board
+from reachability_a_star import ReachabilityAStarSolver
+
+MAGIC = b"RRTB"
+VERSION = 1
+# magic, version, rows, cols, robots, target cell, max moves, board layout key
+HEADER = struct.Struct("<4sHHHHHH16s")
+HEADER_SIZE = 64
+
+
+class Tablebase:
+    def __init__(self, path, compiled_board, target_cell, num_robots, max_moves, table):
+        """
+        Exact distances to one target for every placement of the robots, read
+        from a memory-mapped file. Use Tablebase.build to create one and
+        Tablebase.load to open it.
+
+        There is one byte per canonical placement (target robot cell, sorted
+        helper cells), holding the number of moves to the target plus one, or 0
+        when the target is more than max_moves moves away or can't be reached.
+        Placements are indexed by the target robot cell and the combinatorial
+        rank of the helper cells, so a lookup is O(1). The color of the target
+        robot doesn't matter, since canonical states only tell it apart from
+        the helpers.
+
+        Args:
+            path (str): The tablebase file.
+            compiled_board (CompiledBoard): The board of the tablebase.
+            target_cell (int): Flat index of the target cell.
+            num_robots (int): Number of robots, including the target robot.
+            max_moves (int): Deepest distance stored.
+            table (mmap): The mapped file, header included.
+        """
+        self.path = path
+        self.compiled_board = compiled_board
+        self.target_cell = target_cell
+        self.num_robots = num_robots
+        self.max_moves = max_moves
+        self.table = table
+        self.offset = HEADER_SIZE
+        self.cell_bits = max(8, (compiled_board.num_cells - 1).bit_length())
+        self.cell_mask = (1 << self.cell_bits) - 1
+        self.helper_count = comb(compiled_board.num_cells - 1, num_robots - 1)
+        # binomials[j][n] = comb(n, j + 1), for ranking the helper cells
+        self.binomials = [
+            [comb(n, j + 1) for n in range(compiled_board.num_cells)] for j in range(num_robots - 1)
+        ]
+
+    @staticmethod
+    def table_size(num_cells, num_robots):
+        """Number of canonical placements, one byte each."""
+        return num_cells * comb(num_cells - 1, num_robots - 1)
+
+    @classmethod
+    def build(cls, path, board, target_pos, num_robots=4, max_moves=3, progress_callback=None):
+        """
+        Build a tablebase by retrograde analysis and save it to a file.
+
+        A backward breadth-first search starts from every placement with the
+        target robot on the target and walks the moves in reverse: a robot
+        stopped by a wall or a robot can have come from any free cell behind
+        it. The first layer a placement is reached in is its exact distance.
+
+        The file has the size of the whole table (see table_size), but only
+        the pages holding reached placements are written, so it stays sparse
+        on file systems that support it.
+
+        Args:
+            path (str): The file to write.
+            board (list): 2D list representing the game board cells. Each cell is a dict with "walls".
+            target_pos (tuple): The target cell position (row, col).
+            num_robots (int): Number of robots, including the target robot.
+            max_moves (int): Deepest distance to store.
+            progress_callback (callable): Optional callback taking the number of placements
+                                          stored, returning False to cancel (the file is removed).
+
+        Returns:
+            Tablebase: The new tablebase, or None if cancelled.
+        """
+        compiled_board = compile_board(board)
+        target_cell = compiled_board.index(target_pos)
+        size = cls.table_size(compiled_board.num_cells, num_robots)
+        with open(path, "wb") as file:
+            file.write(HEADER.pack(MAGIC, VERSION, compiled_board.rows, compiled_board.cols, num_robots,
+                                   target_cell, max_moves, bytes.fromhex(compiled_board.layout_key)))
+            file.truncate(HEADER_SIZE + size)
+        tablebase = cls._map(path, compiled_board, "r+b")
+        if not tablebase._fill(progress_callback):
+            tablebase.close()
+            os.remove(path)
+            return None
+        tablebase.table.flush()
+        return tablebase
+
+    @classmethod
+    def load(cls, path, board):
+        """
+        Open a tablebase file.
+
+        Args:
+            path (str): The tablebase file.
+            board (list): The board the tablebase is used with; a ValueError is raised if
+                          its walls differ from the ones the tablebase was built for.
+        """
+        return cls._map(path, compile_board(board), "rb")
+
+    @classmethod
+    def _map(cls, path, compiled_board, mode):
+        with open(path, mode) as file:
+            header = file.read(HEADER_SIZE)
+            magic, version, rows, cols, num_robots, target_cell, max_moves, layout_key = HEADER.unpack_from(header)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"Not a tablebase file: {path}")
+            if ((compiled_board.rows, compiled_board.cols) != (rows, cols)
+                    or bytes.fromhex(compiled_board.layout_key) != layout_key):
+                raise ValueError(f"The tablebase {path} was built for another board")
+            access = mmap.ACCESS_WRITE if "+" in mode else mmap.ACCESS_READ
+            table = mmap.mmap(file.fileno(), 0, access=access)
+        return cls(path, compiled_board, target_cell, num_robots, max_moves, table)
+
+    def close(self):
+        self.table.close()
+
+    def index(self, state):
+        """Return the position in the table of a canonical packed state (see StateCodec)."""
+        cell_bits = self.cell_bits
+        cell_mask = self.cell_mask
+        target = state & cell_mask
+        rank = 0
+        for j, binomials in enumerate(self.binomials):
+            helper = (state >> ((j + 1) * cell_bits)) & cell_mask
+            # Helper cells skip the target robot cell, so they fit in num_cells - 1 values
+            rank += binomials[helper - (helper > target)]
+        return self.offset + target * self.helper_count + rank
+
+    def lookup(self, state):
+        """
+        Return the exact number of moves from a canonical packed state to the
+        target, or None if it is more than max_moves.
+        """
+        value = self.table[self.index(state)]
+        return value - 1 if value else None
+
+    def _fill(self, progress_callback):
+        """Run the retrograde analysis into the table, see build."""
+        table = self.table
+        num_cells = self.compiled_board.num_cells
+        cell_bits = self.cell_bits
+        stored = 0
+        last_report_time = time.time()
+
+        layer = []
+        others = [cell for cell in range(num_cells) if cell != self.target_cell]
+        for helpers in combinations(others, self.num_robots - 1):
+            state = self._pack(self.target_cell, helpers)
+            table[self.index(state)] = 1
+            layer.append(state)
+        stored += len(layer)
+
+        for distance in range(1, self.max_moves + 1):
+            next_layer = []
+            value = distance + 1
+            for state in layer:
+                cells = [(state >> (slot * cell_bits)) & self.cell_mask for slot in range(self.num_robots)]
+                for robot, cell in self._predecessors(cells):
+                    if robot == 0:
+                        previous = self._pack(cell, cells[1:])
+                    else:
+                        helpers = cells[1:robot] + cells[robot + 1:] + [cell]
+                        helpers.sort()
+                        previous = self._pack(cells[0], helpers)
+                    index = self.index(previous)
+                    if not table[index]:
+                        table[index] = value
+                        next_layer.append(previous)
+                if progress_callback and time.time() - last_report_time > 0.5:
+                    last_report_time = time.time()
+                    if not progress_callback(stored + len(next_layer)):
+                        return False
+            stored += len(next_layer)
+            layer = next_layer
+        if progress_callback:
+            progress_callback(stored)
+        return True
+
+    def _predecessors(self, cells):
+        """
+        Generate the moves that could have led to a placement, in reverse.
+
+        Yields:
+            (int, int): Slot of the robot that moved and the cell it came from.
+        """
+        neighbors = self.compiled_board.neighbors
+        occupied = set(cells)
+        for robot, cell in enumerate(cells):
+            for direction in range(4):
+                # The robot only stops here if something blocks the next cell
+                ahead = neighbors[cell * 4 + direction]
+                if ahead >= 0 and ahead not in occupied:
+                    continue
+                back = direction ^ 1
+                previous = neighbors[cell * 4 + back]
+                while previous >= 0 and previous not in occupied:
+                    yield robot, previous
+                    previous = neighbors[previous * 4 + back]
+
+    def _pack(self, target_cell, helper_cells):
+        state = target_cell
+        for slot, cell in enumerate(helper_cells, 1):
+            state |= cell << (slot * self.cell_bits)
+        return state
+
+
+class TablebaseSolver(ReachabilityAStarSolver):
+    def __init__(self, board, initial_positions, target_color, target_pos, max_depth=30,
+                 tablebase=None, heuristic="reachability"):
+        """
+        A* that stops as soon as it reaches a placement stored in a tablebase.
+
+        Tabled placements have an exact heuristic and count as goals; the rest
+        of the solution is read from the tablebase. Placements missing from it
+        are more than max_moves moves away, which also tightens the heuristic.
+
+        Args:
+            board (list): 2D list representing the game board cells. Each cell is a dict with "walls".
+            initial_positions (dict): Mapping from robot color to position tuple (row, col).
+            target_color (str): The color of the robot that must reach the target.
+            target_pos (tuple): The target cell position (row, col).
+            max_depth (int): Maximum number of moves (depth) to search.
+            tablebase (Tablebase): Tablebase of this board, target and number of robots.
+            heuristic (str): 'reachability' or 'robot_aware' (see ReachabilityAStarSolver).
+        """
+        super().__init__(board, initial_positions, target_color, target_pos, max_depth, heuristic)
+        if tablebase is None:
+            raise ValueError("TablebaseSolver needs a tablebase")
+        if (tablebase.target_cell != self.target_cell or tablebase.num_robots != self.codec.num_robots
+                or tablebase.compiled_board.layout_key != self.compiled_board.layout_key):
+            raise ValueError("The tablebase doesn't match the puzzle")
+        self.tablebase = tablebase
+
+    def _is_goal(self, state):
+        return self.tablebase.lookup(state) is not None
+
+    def _heuristic(self, state):
+        distance = self.tablebase.lookup(state)
+        if distance is not None:
+            return distance
+        return max(super()._heuristic(state), self.tablebase.max_moves + 1)
+
+    def _goal_path(self, state):
+        """Follow the tablebase down to the target, one move that lowers the distance at a time."""
+        lookup = self.tablebase.lookup
+        distance = lookup(state)
+        moves = []
+        while distance:
+            for move, new_state in self._successors(state):
+                if lookup(new_state) == distance - 1:
+                    moves.append(move)
+                    state = new_state
+                    distance -= 1
+                    break
+        return moves
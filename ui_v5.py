@@ -5,18 +5,24 @@ import time
 import threading
 
 
+from board import compile_board
+from game_core import GRID_SIZE, create_board, move_robot, place_robots_randomly, random_target
 from manhattan_a_star import AStarSolver
 from reachability_a_star import ReachabilityAStarSolver
+from ida_star import IDAStarSolver
+from anytime import AnytimeSolver
+from portfolio import PortfolioSolver, WinStats
+from solution_cache import SolutionCache
 
 class RicochetRobotsGame:
-    def __init__(self, root):
+    def __init__(self, root, seed=None):
         self.root = root
         self.root.title("Ricochet Robots v5")
         self.root.geometry("1000x720")
         self.root.resizable(True, True)
         
         # Game constants
-        self.GRID_SIZE = 16
+        self.GRID_SIZE = GRID_SIZE
         self.CELL_SIZE = 40
         self.ROBOT_RADIUS = 15
         self.WALL_WIDTH = 4
@@ -35,8 +41,13 @@ class RicochetRobotsGame:
             }
         }
         
-        # Game state
+        # Game state (seed the generator for reproducible games)
+        self.rng = random.Random(seed)
+        # Solutions persist across games and runs
+        self.solution_cache = SolutionCache()
+        self.win_stats = WinStats()
         self.board = self._create_board()
+        self.compiled_board = compile_board(self.board)
         self.robots = {
             "red": {"pos": (0, 0), "selected": False},
             "green": {"pos": (0, 0), "selected": False},
@@ -143,6 +154,30 @@ class RicochetRobotsGame:
         )
         self.reachability_solve_btn.pack(fill=tk.X, pady=5, padx=5)
         
+        self.robot_aware_solve_btn = tk.Button(
+            self.solver_frame, text="A* (Robot-aware)", command=lambda: self.solve_game("robot_aware"),
+            font=("Arial", 11), bg="#3F51B5", fg="white", height=1
+        )
+        self.robot_aware_solve_btn.pack(fill=tk.X, pady=5, padx=5)
+        
+        self.ida_star_solve_btn = tk.Button(
+            self.solver_frame, text="IDA* (Reachability)", command=lambda: self.solve_game("ida_star"),
+            font=("Arial", 11), bg="#009688", fg="white", height=1
+        )
+        self.ida_star_solve_btn.pack(fill=tk.X, pady=5, padx=5)
+        
+        self.anytime_solve_btn = tk.Button(
+            self.solver_frame, text="Anytime A* (Robot-aware)", command=lambda: self.solve_game("anytime"),
+            font=("Arial", 11), bg="#00796B", fg="white", height=1
+        )
+        self.anytime_solve_btn.pack(fill=tk.X, pady=5, padx=5)
+        
+        self.portfolio_solve_btn = tk.Button(
+            self.solver_frame, text="Portfolio (race solvers)", command=lambda: self.solve_game("portfolio"),
+            font=("Arial", 11), bg="#795548", fg="white", height=1
+        )
+        self.portfolio_solve_btn.pack(fill=tk.X, pady=5, padx=5)
+        
         self.give_up_btn = tk.Button(
             self.control_frame, text="Give Up", command=self.give_up,
             font=("Arial", 12), bg="#F44336", fg="white", height=2
@@ -177,64 +212,19 @@ class RicochetRobotsGame:
         self.new_game()
     
     def _create_board(self):
-        # ...existing code...
-        board = [[{"walls": set()} for _ in range(self.GRID_SIZE)] for _ in range(self.GRID_SIZE)]
-        # Outer walls
-        for i in range(self.GRID_SIZE):
-            board[0][i]["walls"].add("N")
-            board[self.GRID_SIZE - 1][i]["walls"].add("S")
-            board[i][0]["walls"].add("W")
-            board[i][self.GRID_SIZE - 1]["walls"].add("E")
-        # Central square walls
-        for i in range(7, 9):
-            for j in range(7, 9):
-                if i == 7:
-                    board[i][j]["walls"].add("N")
-                if i == 8:
-                    board[i][j]["walls"].add("S")
-                if j == 7:
-                    board[i][j]["walls"].add("W")
-                if j == 8:
-                    board[i][j]["walls"].add("E")
-        # Random internal walls (~40)
-        wall_count = 0
-        while wall_count < 40:
-            x = random.randint(0, self.GRID_SIZE - 2)
-            y = random.randint(0, self.GRID_SIZE - 2)
-            if random.choice([True, False]):
-                if "S" not in board[x][y]["walls"] and "N" not in board[x][y + 1]["walls"]:
-                    board[x][y]["walls"].add("S")
-                    board[x][y + 1]["walls"].add("N")
-                    wall_count += 1
-            else:
-                if "E" not in board[x][y]["walls"] and "W" not in board[x + 1][y]["walls"]:
-                    board[x][y]["walls"].add("E")
-                    board[x + 1][y]["walls"].add("W")
-                    wall_count += 1
-        return board
+        return create_board(self.rng, self.GRID_SIZE)
     
     def _place_robots_randomly(self):
-        positions = set()
-        for color in self.robots:
-            while True:
-                x = random.randint(0, self.GRID_SIZE - 1)
-                y = random.randint(0, self.GRID_SIZE - 1)
-                if ((x, y) not in positions and not (7 <= x <= 8 and 7 <= y <= 8)):
-                    self.robots[color]["pos"] = (x, y)
-                    positions.add((x, y))
-                    break
+        positions = place_robots_randomly(self.rng, list(self.robots.keys()), self.GRID_SIZE)
+        for color, pos in positions.items():
+            self.robots[color]["pos"] = pos
         self.initial_positions = {color: robot["pos"] for color, robot in self.robots.items()}
     
     def _set_random_target(self):
-        colors = list(self.robots.keys())
-        self.current_target["color"] = random.choice(colors)
-        robot_positions = {self.robots[color]["pos"] for color in self.robots}
-        while True:
-            x = random.randint(0, self.GRID_SIZE - 1)
-            y = random.randint(0, self.GRID_SIZE - 1)
-            if ((x, y) not in robot_positions and not (7 <= x <= 8 and 7 <= y <= 8)):
-                self.current_target["pos"] = (x, y)
-                break
+        robot_positions = {color: robot["pos"] for color, robot in self.robots.items()}
+        self.current_target["color"], self.current_target["pos"] = random_target(
+            self.rng, robot_positions, self.GRID_SIZE
+        )
     
     def draw_board(self):
         self.canvas.delete("all")
@@ -356,29 +346,8 @@ class RicochetRobotsGame:
     def move_robot(self, color, direction):
         robot = self.robots[color]
         x, y = robot["pos"]
-        dx, dy = 0, 0
-        if direction == "N":
-            dx = -1
-        elif direction == "S":
-            dx = 1
-        elif direction == "W":
-            dy = -1
-        elif direction == "E":
-            dy = 1
-        new_x, new_y = x, y
-        while True:
-            if direction in self.board[new_x][new_y]["walls"]:
-                break
-            next_x, next_y = new_x + dx, new_y + dy
-            if not (0 <= next_x < self.GRID_SIZE and 0 <= next_y < self.GRID_SIZE):
-                break
-            opposite = {"N": "S", "S": "N", "E": "W", "W": "E"}[direction]
-            if opposite in self.board[next_x][next_y]["walls"]:
-                break
-            robot_positions = {self.robots[c]["pos"] for c in self.robots if c != color}
-            if (next_x, next_y) in robot_positions:
-                break
-            new_x, new_y = next_x, next_y
+        positions = {c: r["pos"] for c, r in self.robots.items()}
+        new_x, new_y = move_robot(self.compiled_board, positions, color, direction)
         if (new_x, new_y) != (x, y):
             robot["pos"] = (new_x, new_y)
             self.moves_count += 1
@@ -400,6 +369,7 @@ class RicochetRobotsGame:
     
     def new_game(self):
         self.board = self._create_board()
+        self.compiled_board = compile_board(self.board)
         self._place_robots_randomly()
         self._set_random_target()
         self.moves_count = 0
@@ -496,7 +466,8 @@ class RicochetRobotsGame:
         Solve the game using the specified solver.
         
         Args:
-            solver_type (str): The type of solver to use: 'manhattan' or 'reachability'
+            solver_type (str): The type of solver to use: 'manhattan', 'reachability',
+                               'robot_aware', 'ida_star', 'anytime' or 'portfolio'
         """
         if self.is_showing_solution:
             self.is_showing_solution = False
@@ -514,35 +485,49 @@ class RicochetRobotsGame:
         initial_positions = {color: robot["pos"] for color, robot in self.robots.items()}
         
         # Shared variables between threads
-        solution_result = {"solution": None, "states_explored": 0}
+        solution_result = {"solution": None, "states_explored": 0, "cached": False, "optimal": True,
+                           "lower_bound": 0, "winner": None}
         
         def solver_thread():
             """
             This function runs the selected solver in a separate thread to avoid blocking the UI.
             It also updates the progress window with the number of states explored.
             """
-            # Create solver based on the type with a new callback for progress updates
+            def progress_callback(states_explored):
+                solution_result["states_explored"] = states_explored
+                self.root.after(100, lambda: progress_window.update_states(states_explored))
+                return not progress_window.cancelled and not progress_window.accepted
+            
+            # Create solver based on the type
             if solver_type == "manhattan":
                 solver = AStarSolver(self.board, initial_positions, target_color, target_pos)
-                
-                def progress_callback(states_explored):
-                    solution_result["states_explored"] = states_explored
-                    self.root.after(100, lambda: progress_window.update_states(states_explored))
-                    return not progress_window.cancelled
-                
-                # Run the solver with the callback
-                solution = solver.a_star_search(progress_callback)
-                
             elif solver_type == "reachability":
                 solver = ReachabilityAStarSolver(self.board, initial_positions, target_color, target_pos)
-                
-                def progress_callback(states_explored):
-                    solution_result["states_explored"] = states_explored
-                    self.root.after(100, lambda: progress_window.update_states(states_explored))
-                    return not progress_window.cancelled
-                
-                # Run the solver with the callback
-                solution = solver.a_star_search(progress_callback)
+            elif solver_type == "robot_aware":
+                solver = ReachabilityAStarSolver(self.board, initial_positions, target_color, target_pos,
+                                                 heuristic="robot_aware")
+            elif solver_type == "ida_star":
+                solver = IDAStarSolver(self.board, initial_positions, target_color, target_pos)
+            elif solver_type == "anytime":
+                solver = AnytimeSolver(self.board, initial_positions, target_color, target_pos,
+                                       heuristic="robot_aware")
+            elif solver_type == "portfolio":
+                solver = PortfolioSolver(self.board, initial_positions, target_color, target_pos,
+                                         win_stats=self.win_stats)
+            
+            if solver_type == "anytime":
+                solution = self._solve_anytime(solver, progress_callback, progress_window, solution_result)
+            else:
+                # Run the solver with the callback, unless the solution cache already knows the answer
+                try:
+                    solution = self.solution_cache.solve(solver, progress_callback)
+                except RuntimeError as error:
+                    # The portfolio raises when all its engines failed
+                    solution = None
+                    solution_result["error"] = str(error)
+                solution_result["cached"] = solver.stats.get("cache_hit", False)
+                solution_result["winner"] = solver.stats.get("winner")
+                solution_result["optimal"] = solver.stats.get("optimal", True)
             
             solution_result["solution"] = solution
             
@@ -558,13 +543,23 @@ class RicochetRobotsGame:
                 self.solution_moves = solution
                 self.is_showing_solution = True
                 self.solution_step_index = 0
-                messagebox.showinfo("Solution Found", 
-                                  f"Solution found in {len(solution)} moves after exploring "
-                                  f"{solution_result['states_explored']} states.\n"
-                                  f"Watching the solution...")
+                if solution_result["cached"]:
+                    found = f"Solution found in {len(solution)} moves in the solution cache.\n"
+                else:
+                    found = (f"Solution found in {len(solution)} moves after exploring "
+                             f"{solution_result['states_explored']} states.\n")
+                if solution_result["winner"]:
+                    found += f"Fastest solver: {solution_result['winner']}.\n"
+                if not solution_result["optimal"] and solution_result["lower_bound"]:
+                    found += f"It may not be optimal: at least {solution_result['lower_bound']} moves are needed.\n"
+                elif not solution_result["optimal"]:
+                    found += "It may not be optimal.\n"
+                messagebox.showinfo("Solution Found", found + "Watching the solution...")
                 self._show_next_solution_step()
             else:
-                if progress_window.cancelled:
+                if solution_result.get("error"):
+                    messagebox.showerror("Solver Error", solution_result["error"])
+                elif progress_window.cancelled:
                     messagebox.showinfo("Search Cancelled", "The solver was cancelled.")
                 else:
                     messagebox.showerror("No Solution", 
@@ -576,6 +571,34 @@ class RicochetRobotsGame:
         solver_thread.daemon = True  # This ensures the thread will exit when the main program exits
         solver_thread.start()
 
+    def _solve_anytime(self, solver, progress_callback, progress_window, solution_result):
+        """
+        Run an AnytimeSolver, showing each better solution in the progress window.
+        Runs in the solver thread.
+
+        Returns:
+            list: The best solution when the search ends or the user accepts it,
+                  None if there is none or the search was cancelled.
+        """
+        puzzle = (solver.board, solver.initial_positions, solver.target_color, solver.target_pos)
+        entry = self.solution_cache.get(*puzzle, solver.max_depth)
+        if entry is not None:
+            solution_result["cached"] = True
+            return entry["moves"]
+        best = None
+        for best in solver.anytime_search(progress_callback):
+            self.root.after(0, lambda result=best: progress_window.show_best(result))
+        if progress_window.cancelled:
+            return None
+        if best is None:
+            if not progress_window.accepted:
+                self.solution_cache.put(*puzzle, None, solver.max_depth)
+            return None
+        self.solution_cache.put(*puzzle, best["moves"], solver.max_depth, best["optimal"])
+        solution_result["optimal"] = best["optimal"]
+        solution_result["lower_bound"] = best["lower_bound"]
+        return best["moves"]
+
     def _show_next_solution_step(self):
         if not self.is_showing_solution or self.solution_step_index >= len(self.solution_moves):
             self.is_showing_solution = False
@@ -592,7 +615,7 @@ class SolverProgressWindow:
     def __init__(self, parent, solver_type="manhattan"):
         self.window = tk.Toplevel(parent)
         self.window.title(f"Solver Progress - {self._get_solver_name(solver_type)}")
-        self.window.geometry("400x200")
+        self.window.geometry("400x240")
         self.window.resizable(False, False)
         self.window.transient(parent)  # Make this window related to the parent
         self.window.grab_set()  # Make this window modal
@@ -603,7 +626,7 @@ class SolverProgressWindow:
         parent_width = parent.winfo_width()
         parent_height = parent.winfo_height()
         x = parent_x + (parent_width - 400) // 2
-        y = parent_y + (parent_height - 200) // 2
+        y = parent_y + (parent_height - 240) // 2
         self.window.geometry(f"+{x}+{y}")
         
         # Status message
@@ -630,13 +653,26 @@ class SolverProgressWindow:
         self.states_label = tk.Label(self.stats_frame, textvariable=self.states_var, font=("Arial", 10))
         self.states_label.pack(side=tk.RIGHT, padx=10)
         
-        # Cancel button
-        self.cancel_btn = tk.Button(self.window, text="Cancel", command=self.cancel, 
+        # Best solution so far, for solvers that report them (see show_best)
+        self.best_var = tk.StringVar(value="Best solution: none yet")
+        self.best_label = tk.Label(self.window, textvariable=self.best_var, font=("Arial", 10))
+        self.best_label.pack()
+        
+        # Accept and cancel buttons
+        self.buttons_frame = tk.Frame(self.window)
+        self.buttons_frame.pack(pady=10)
+        
+        self.accept_btn = tk.Button(self.buttons_frame, text="Accept", command=self.accept,
+                                   font=("Arial", 11), bg="#4CAF50", fg="white", state=tk.DISABLED)
+        self.accept_btn.pack(side=tk.LEFT, padx=5)
+        
+        self.cancel_btn = tk.Button(self.buttons_frame, text="Cancel", command=self.cancel, 
                                    font=("Arial", 11), bg="#F44336", fg="white")
-        self.cancel_btn.pack(pady=10)
+        self.cancel_btn.pack(side=tk.LEFT, padx=5)
         
-        # Flag to track if the search was cancelled
+        # Flags to track if the search was cancelled, or stopped to keep the best solution
         self.cancelled = False
+        self.accepted = False
         
         # Start the timer
         self.start_time = time.time()
@@ -647,10 +683,18 @@ class SolverProgressWindow:
             return "Manhattan Heuristic"
         elif solver_type == "reachability":
             return "Reachability Heuristic"
+        elif solver_type == "robot_aware":
+            return "Robot-aware Heuristic"
+        elif solver_type == "ida_star":
+            return "IDA* Reachability"
+        elif solver_type == "anytime":
+            return "Anytime A* Robot-aware"
+        elif solver_type == "portfolio":
+            return "Solver Portfolio"
         return "Unknown Solver"
     
     def update_timer(self):
-        if not self.cancelled:
+        if not self.cancelled and not self.accepted:
             elapsed = int(time.time() - self.start_time)
             self.time_var.set(f"Elapsed: {elapsed}s")
             self.window.after(1000, self.update_timer)
@@ -661,6 +705,20 @@ class SolverProgressWindow:
     def set_status(self, text):
         self.status_var.set(text)
     
+    def show_best(self, result):
+        """Show a solution reported by an anytime search (see AnytimeSolver.anytime_search)."""
+        if self.cancelled or self.accepted:
+            return
+        if result["optimal"]:
+            self.best_var.set(f"Best solution: {result['length']} moves (optimal)")
+        else:
+            self.best_var.set(f"Best solution: {result['length']} moves, optimal is at least {result['lower_bound']}")
+            self.accept_btn.config(state=tk.NORMAL)
+    
+    def accept(self):
+        self.accepted = True
+        self.set_status("Stopping with the best solution...")
+    
     def cancel(self):
         self.cancelled = True
         self.set_status("Cancelling...")
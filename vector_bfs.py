@@ -0,0 +1,310 @@
+import numpy as np
+
+from distance_tables import UNREACHABLE, distance_cache
+from solver_base import BaseSolver
+
+# Frontier states expanded at once, bounds the size of the temporary arrays and the
+# time between two progress callbacks within a layer
+CHUNK_SIZE = 1 << 16
+
+
+def unique_first(values):
+    """
+    Sort and deduplicate an array.
+
+    Returns:
+        (ndarray, ndarray): The sorted unique values and the index of the first occurrence of each.
+    """
+    order = np.argsort(values, kind="stable")
+    values = values[order]
+    keep = np.empty(len(values), dtype=bool)
+    keep[:1] = True
+    np.not_equal(values[1:], values[:-1], out=keep[1:])
+    return values[keep], order[keep]
+
+
+class VectorBFSSolver(BaseSolver):
+    admissible = True
+
+    def __init__(self, board, initial_positions, target_color, target_pos, max_depth=30):
+        """
+        Optimal solver running a layer-synchronous breadth-first search on NumPy arrays.
+
+        Every BFS layer is an array of canonical packed states (see StateCodec).
+        The moves of all robots in all directions are computed for the whole
+        layer at once from the wall stop tables, with the other robots checked
+        as blockers by array comparisons, so the Python interpreter only runs a
+        few dozen operations per layer instead of per state.
+
+        It expands several times more states than the robot-aware A*, whose
+        heuristic can't be computed on arrays, so it is only 2 to 5 times
+        faster on 12 to 17 move puzzles.
+
+        Args:
+            board (list): 2D list representing the game board cells. Each cell is a dict with "walls".
+            initial_positions (dict): Mapping from robot color to position tuple (row, col).
+            target_color (str): The color of the robot that must reach the target.
+            target_pos (tuple): The target cell position (row, col).
+            max_depth (int): Maximum number of moves (depth) to search.
+        """
+        super().__init__(board, initial_positions, target_color, target_pos, max_depth)
+        compiled_board = self.compiled_board
+        cells = np.arange(compiled_board.num_cells, dtype=np.int64)
+        self.rows = cells // compiled_board.cols
+        self.cols = cells % compiled_board.cols
+        # wall_steps[cell * 4 + d]: number of cells a lone robot slides from cell in direction d
+        self.wall_steps = np.array([len(ray) for ray in compiled_board.rays], dtype=np.int64)
+        self.deltas = np.array(compiled_board.deltas, dtype=np.int64)
+        # Reachability distances prune states that can't reach the target within max_depth
+        self.distance_table = np.frombuffer(
+            distance_cache.get(compiled_board)[self.target_cell], dtype=np.uint8
+        ).astype(np.int64)
+
+    def _heuristic(self, state):
+        return int(self.distance_table[state & self.codec.cell_mask])
+
+    def solve(self, progress_callback=None):
+        """Find an optimal solution, see bfs_search."""
+        return self.bfs_search(progress_callback)
+
+    def bfs_search(self, progress_callback=None):
+        """
+        Search layer by layer until a state of the last layer has the target robot on the target.
+
+        Like IDA*, the search is repeated with a growing bound on g + h, using
+        the reachability distance as h, so states that can't reach the target
+        within the bound are never stored. The bound starts at h of the start
+        state and stops growing once it no longer cuts any state.
+
+        Each layer keeps, for every state, the index of its parent in the
+        previous layer and the code of the move that led to it, so the path is
+        rebuilt by walking back through the layers. New states are deduplicated
+        by sorting and checked against the sorted array of all visited states.
+
+        Args:
+            progress_callback (callable): Optional callback function to report progress
+                                        and check for cancellation, called after every
+                                        CHUNK_SIZE frontier states and every layer.
+
+        Returns:
+            list: A list of (color, direction) moves, or None if no solution is found.
+        """
+        codec = self.codec
+        start_state = codec.canonical(codec.pack(self.initial_positions))
+        self.stats = {"expansions": 0, "generated": 0, "states_explored": 1}
+        if self._is_goal(start_state):
+            self._record_stats(0, 0, 1)
+            return []
+        if self._heuristic(start_state) > self.max_depth:
+            self._record_stats(0, 0, 1)
+            return None
+
+        expansions = 0
+        generated = 0
+        states_explored = 1
+        bound = self._heuristic(start_state)
+        while bound <= self.max_depth:
+            result = self._bounded_search(start_state, bound, progress_callback)
+            expansions += self.layer_expansions
+            generated += self.layer_generated
+            states_explored = max(states_explored, self.layer_states)
+            if result is not None or self.cancelled or not self.bound_pruned:
+                break
+            bound += 1
+
+        self._record_stats(expansions, generated, states_explored)
+        if progress_callback and not self.cancelled:
+            progress_callback(states_explored)
+        return self._to_moves(result) if result is not None else None
+
+    def _bounded_search(self, start_state, bound, progress_callback):
+        """
+        Breadth-first search keeping only states that may reach the target
+        within bound moves (g + h <= bound).
+
+        Returns:
+            list: Move codes of a solution, or None.
+        """
+        codec = self.codec
+        self.layer_expansions = 0
+        self.layer_generated = 0
+        self.cancelled = False
+        self.bound_pruned = False
+        frontier = np.array([start_state], dtype=np.uint64)
+        visited = frontier
+        layers = []
+        for depth in range(1, bound + 1):
+            expanded = self._expand_layer(frontier, bound - depth, progress_callback, len(visited))
+            if expanded is None:
+                self.cancelled = True
+                self.layer_states = len(visited)
+                return None
+            states, parents, moves, generated = expanded
+            self.layer_expansions += len(frontier)
+            self.layer_generated += generated
+            # Keep the states not seen in earlier layers
+            positions = np.searchsorted(visited, states)
+            new = visited[np.minimum(positions, len(visited) - 1)] != states
+            states, parents, moves = states[new], parents[new], moves[new]
+            layers.append((parents, moves))
+            if not len(states):
+                break
+            # Both arrays are sorted and disjoint, so inserting at the searched positions merges them
+            visited = np.insert(visited, positions[new], states)
+            self.layer_states = len(visited)
+
+            goals = np.flatnonzero((states & np.uint64(codec.cell_mask)) == np.uint64(self.target_cell))
+            if len(goals):
+                return self._path(layers, int(goals[0]))
+            if progress_callback and not progress_callback(len(visited)):
+                self.cancelled = True
+                return None
+            frontier = states
+        self.layer_states = len(visited)
+        return None
+
+    def _expand_layer(self, frontier, remaining, progress_callback=None, states_explored=0):
+        """
+        Generate the next layer from a frontier, chunk by chunk, calling the
+        progress callback with states_explored between two chunks.
+
+        Returns:
+            (ndarray, ndarray, ndarray, int): Unique sorted child states, index of
+                                              their parent in the frontier, move
+                                              codes, and the number of children
+                                              generated before deduplication.
+                                              None if the callback cancelled the search.
+        """
+        all_states, all_parents, all_moves = [], [], []
+        generated = 0
+        for start in range(0, len(frontier), CHUNK_SIZE):
+            if start and progress_callback and not progress_callback(states_explored):
+                return None
+            states, parents, moves = self._children(frontier[start:start + CHUNK_SIZE], remaining)
+            generated += len(states)
+            states, first = unique_first(states)
+            all_states.append(states)
+            all_parents.append(parents[first] + start)
+            all_moves.append(moves[first])
+        states, first = unique_first(np.concatenate(all_states))
+        return states, np.concatenate(all_parents)[first], np.concatenate(all_moves)[first], generated
+
+    def _children(self, frontier, remaining):
+        """
+        Apply every robot move to every state of a frontier chunk, keeping the
+        children whose target robot may still reach the target in the remaining moves.
+
+        Returns:
+            (ndarray, ndarray, ndarray): Canonical child states, index of their
+                                         parent in the chunk and move codes.
+        """
+        codec = self.codec
+        num_robots = codec.num_robots
+        cell_mask = np.uint64(codec.cell_mask)
+        cells = [((frontier >> np.uint64(shift)) & cell_mask).astype(np.int64) for shift in codec.shifts]
+        all_states, all_parents, all_moves = [], [], []
+
+        # Target robot moves
+        indices = np.arange(len(frontier), dtype=np.int64)
+        for direction in range(4):
+            parents, stop = self._slide(cells, indices, 0, direction)
+            distances = self.distance_table[stop]
+            self._note_bound_pruned(distances, remaining)
+            keep = distances <= remaining
+            parents, stop = parents[keep], stop[keep]
+            helper_cells = [cells[slot][parents] for slot in range(1, num_robots)]
+            all_states.append(self._pack(stop, helper_cells))
+            all_parents.append(parents)
+            all_moves.append(cells[0][parents] << 2 | direction)
+
+        # Helper moves leave the target robot in place, so only states whose target
+        # robot is already close enough can use them
+        distances = self.distance_table[cells[0]]
+        self._note_bound_pruned(distances, remaining)
+        indices = np.flatnonzero(distances <= remaining)
+        for robot in range(1, num_robots):
+            for direction in range(4):
+                parents, stop = self._slide(cells, indices, robot, direction)
+                helper_cells = [stop if slot == robot else cells[slot][parents] for slot in range(1, num_robots)]
+                all_states.append(self._pack(cells[0][parents], helper_cells))
+                all_parents.append(parents)
+                all_moves.append(cells[robot][parents] << 2 | direction)
+
+        moves = np.concatenate(all_moves).astype(np.uint16)
+        return np.concatenate(all_states), np.concatenate(all_parents), moves
+
+    def _slide(self, cells, indices, robot, direction):
+        """
+        Slide one robot in one direction in the given states, stopping in front
+        of the nearest other robot on its way.
+
+        Args:
+            cells (list): Per robot slot, the array of its cells in every state.
+            indices (ndarray): The states to move the robot in.
+            robot (int): Slot of the robot.
+            direction (int): Index of the direction in DIRECTIONS.
+
+        Returns:
+            (ndarray, ndarray): Indices of the states where the robot moved, and its new cells.
+        """
+        cell = cells[robot][indices]
+        row, col = self.rows[cell], self.cols[cell]
+        steps = self.wall_steps[cell * 4 + direction]
+        for other in range(len(cells)):
+            if other == robot:
+                continue
+            other_cell = cells[other][indices]
+            if direction < 2:
+                in_line = self.cols[other_cell] == col
+                distance = self.rows[other_cell] - row
+                if direction == 0:
+                    distance = -distance
+            else:
+                in_line = self.rows[other_cell] == row
+                distance = self.cols[other_cell] - col
+                if direction == 3:
+                    distance = -distance
+            blocked = in_line & (distance >= 1) & (distance <= steps)
+            steps = np.where(blocked, distance - 1, steps)
+        moved = np.flatnonzero(steps > 0)
+        return indices[moved], cell[moved] + self.deltas[direction] * steps[moved]
+
+    def _pack(self, target_cells, helper_cells):
+        """Pack target robot cells and unsorted helper cells into canonical states (see StateCodec.canonical)."""
+        cell_bits = self.codec.cell_bits
+        helper_cells = list(helper_cells)
+        # Odd-even transposition sort across the helper arrays
+        for round_index in range(len(helper_cells)):
+            for slot in range(round_index % 2, len(helper_cells) - 1, 2):
+                low = np.minimum(helper_cells[slot], helper_cells[slot + 1])
+                helper_cells[slot + 1] = np.maximum(helper_cells[slot], helper_cells[slot + 1])
+                helper_cells[slot] = low
+        states = target_cells.astype(np.uint64)
+        for slot, helper in enumerate(helper_cells, 1):
+            states |= helper.astype(np.uint64) << np.uint64(slot * cell_bits)
+        return states
+
+    def _note_bound_pruned(self, distances, remaining):
+        """Remember if the bound, not just unreachability, cut a child, so a higher bound may help."""
+        if not self.bound_pruned:
+            self.bound_pruned = bool(np.any((distances > remaining) & (distances != UNREACHABLE)))
+
+    def _path(self, layers, index):
+        """Walk the parent indices back from a state of the last layer to collect its move codes."""
+        moves = []
+        for parents, layer_moves in reversed(layers):
+            moves.append(int(layer_moves[index]))
+            index = int(parents[index])
+        moves.reverse()
+        return moves
+
+    def _record_stats(self, expansions, generated, states_explored):
+        """Store the counters of the search that just ended in self.stats."""
+        self.stats = {
+            "expansions": expansions,
+            "generated": generated,
+            "states_explored": states_explored,
+            "pruned_moves": 0,
+            "branching_factor": generated / expansions if expansions else 0.0,
+            "unpruned_branching_factor": generated / expansions if expansions else 0.0,
+        }